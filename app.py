@@ -1,17 +1,41 @@
 import os
-from src.utils.chatbot_utils import BuildChatbot
+from src.utils.chat_service import sse_event, SESSION_COOKIE
+from src.utils.session_store import SessionStore
+from src.utils.chat_history_backends import HistoryBackendConfig, history_metrics
+from src.utils.startup import ChatRuntime
+from src.utils.metrics import REGISTRY
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, Response, request, render_template, jsonify, stream_with_context, make_response
 
 
 # initializing flask app
 app = Flask(__name__)
 
-# setting up the chatbot(retriever)
-utils = BuildChatbot()
-chatbot = utils.initialize_chatbot()
+# setting up the chatbot(retriever) in the background, the server binds right away
+# and /readyz reports when chats can be answered
+session_store = SessionStore()
+history_config = HistoryBackendConfig()
+runtime = ChatRuntime(session_store)
+runtime.start()
+
+
+
+def not_ready_response():
+    response = jsonify({"response": "[ERROR] The assistant is starting up, please try again in a few seconds.",
+                        **runtime.status()})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+
+def with_session_cookie(response, session_id: str):
+    """every visitor gets their own server-issued session id, kept in an http-only cookie"""
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="Lax",
+                        max_age=int(session_store.config.idle_ttl_seconds))
+    return response
 
 
 
@@ -19,7 +43,8 @@ chatbot = utils.initialize_chatbot()
 @app.route('/')
 def home():
     # ...removed debug print...
-    return render_template('home_page.html')
+    response = make_response(render_template('home_page.html'))
+    return with_session_cookie(response, session_store.resolve(request.cookies.get(SESSION_COOKIE)))
 
 
 
@@ -28,17 +53,18 @@ def home():
 def chat():
     # ...removed debug print...
     logging.info("/chat route called")
+    if not runtime.ready:
+        return not_ready_response()
     try:
         data = request.get_json()
         logging.info(f"Request JSON: {data}")
         question = data.get('input', '')
         logging.info(f"User Input: {question}")
+        session_id = session_store.resolve(request.cookies.get(SESSION_COOKIE))
 
-        config = {"configurable": {"session_id": "chat_1"}}
         logging.info("Invoking chatbot...")
-        response = chatbot.invoke({"input": question}, config=config)
-        logging.info(f"Chatbot Response: {response['answer']}")
-        return jsonify({"response": response['answer']})    
+        answer = runtime.chat_service.invoke(question, session_id=session_id)
+        return with_session_cookie(jsonify({"response": answer}), session_id)    
     except Exception as e:
         logging.error(f"Chatbot error: {str(e)}", exc_info=True)
     # ...removed debug error return comment...
@@ -46,5 +72,65 @@ def chat():
 
 
 
+@app.route('/chat/stream', methods=["POST"])
+def chat_stream():
+    logging.info("/chat/stream route called")
+    if not runtime.ready:
+        return not_ready_response()
+    data = request.get_json()
+    question = data.get('input', '')
+    logging.info(f"User Input: {question}")
+    session_id = session_store.resolve(request.cookies.get(SESSION_COOKIE))
+
+    def generate():
+        try:
+            for token in runtime.chat_service.stream(question, session_id=session_id):
+                yield sse_event({"token": token})
+            yield sse_event({}, event="done")
+        except Exception as e:
+            logging.error(f"Chatbot error: {str(e)}", exc_info=True)
+            yield sse_event({"error": f"[ERROR] {str(e)}"}, event="error")
+
+    response = Response(stream_with_context(generate()),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache",
+                                 "X-Accel-Buffering": "no"})       # stop reverse proxies from buffering the stream
+    return with_session_cookie(response, session_id)
+
+
+
+@app.route('/stats', methods=["GET"])
+def stats():
+    chat_service = runtime.chat_service
+    return jsonify({"sessions": history_metrics(history_config, session_store),
+                    "semantic_cache": runtime.semantic_cache.stats() if runtime.semantic_cache else None,
+                    "single_flight": chat_service.flights.stats() if chat_service and chat_service.flights else None,
+                    "startup": runtime.status()})
+
+
+
+@app.route('/metrics', methods=["GET"])
+def metrics():
+    # prometheus text format, per-stage latency histograms and token counters
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
+
+
+@app.route('/healthz', methods=["GET"])
+def healthz():
+    # liveness: the process is up and serving requests. A failed startup is never retried,
+    # so it reports unhealthy and the orchestrator restarts the process
+    if runtime.failed:
+        return jsonify({"status": "failed", "error": runtime.error}), 503
+    return jsonify({"status": "ok"})
+
+
+
+@app.route('/readyz', methods=["GET"])
+def readyz():
+    return jsonify(runtime.status()), (200 if runtime.ready else 503)
+
+
+
 if __name__ == "__main__":
-    app.run(debug=False, use_reloader=False)
\ No newline at end of file
+    app.run(debug=False, use_reloader=False)
@@ -0,0 +1,152 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.chat_service import sse_event, SESSION_COOKIE
+from src.utils.session_store import SessionStore
+from src.utils.chat_history_backends import HistoryBackendConfig, history_metrics
+from src.utils.startup import ChatRuntime
+from src.utils.metrics import REGISTRY
+from src.utils.logger import logging
+
+from quart import Quart, Response, request, render_template, jsonify, make_response
+
+
+# async counterpart of app.py, serves the same routes with ainvoke/astream so a single
+# process can keep hundreds of chats waiting on Pinecone/NVIDIA/Groq at the same time
+# run with: hypercorn async_app:app --bind 0.0.0.0:8000
+
+# max chats being answered at once, the rest wait for a free slot
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "256"))
+
+app = Quart(__name__)
+
+# the chatbot is built in a background thread once the server is up, see /readyz
+session_store = SessionStore()
+history_config = HistoryBackendConfig()
+runtime = ChatRuntime(session_store)
+chat_slots = None
+
+
+
+@app.before_serving
+async def setup_concurrency():
+    global chat_slots
+    # created here so it binds to the server's event loop
+    chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
+    # components without native async support (embeddings, pinecone) fall back to
+    # run_in_executor, size the default pool so it doesn't cap concurrency first
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=CHAT_MAX_CONCURRENCY))
+    logging.info(f"Async chat server started with concurrency limit {CHAT_MAX_CONCURRENCY}")
+    runtime.start()
+
+
+
+def not_ready_response():
+    response = jsonify({"response": "[ERROR] The assistant is starting up, please try again in a few seconds.",
+                        **runtime.status()})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
+
+def with_session_cookie(response, session_id: str):
+    """every visitor gets their own server-issued session id, kept in an http-only cookie"""
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="Lax",
+                        max_age=int(session_store.config.idle_ttl_seconds))
+    return response
+
+
+
+@app.route('/')
+async def home():
+    response = await make_response(await render_template('home_page.html'))
+    return with_session_cookie(response, session_store.resolve(request.cookies.get(SESSION_COOKIE)))
+
+
+
+@app.route('/chat', methods=["GET", "POST"])
+async def chat():
+    logging.info("/chat route called")
+    if not runtime.ready:
+        return not_ready_response()
+    try:
+        data = await request.get_json()
+        question = data.get('input', '')
+        logging.info(f"User Input: {question}")
+        session_id = session_store.resolve(request.cookies.get(SESSION_COOKIE))
+
+        async with chat_slots:
+            answer = await runtime.chat_service.ainvoke(question, session_id=session_id)
+        return with_session_cookie(jsonify({"response": answer}), session_id)
+    except Exception as e:
+        logging.error(f"Chatbot error: {str(e)}", exc_info=True)
+        return jsonify({"response": f"[ERROR] {str(e)}"}), 500
+
+
+
+@app.route('/chat/stream', methods=["POST"])
+async def chat_stream():
+    logging.info("/chat/stream route called")
+    if not runtime.ready:
+        return not_ready_response()
+    data = await request.get_json()
+    question = data.get('input', '')
+    logging.info(f"User Input: {question}")
+    session_id = session_store.resolve(request.cookies.get(SESSION_COOKIE))
+
+    async def generate():
+        try:
+            async with chat_slots:
+                async for token in runtime.chat_service.astream(question, session_id=session_id):
+                    yield sse_event({"token": token})
+            yield sse_event({}, event="done")
+        except Exception as e:
+            logging.error(f"Chatbot error: {str(e)}", exc_info=True)
+            yield sse_event({"error": f"[ERROR] {str(e)}"}, event="error")
+
+    response = Response(generate(),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache",
+                                 "X-Accel-Buffering": "no"})
+    return with_session_cookie(response, session_id)
+
+
+
+@app.route('/stats', methods=["GET"])
+async def stats():
+    chat_service = runtime.chat_service
+    return jsonify({"sessions": history_metrics(history_config, session_store),
+                    "semantic_cache": runtime.semantic_cache.stats() if runtime.semantic_cache else None,
+                    "single_flight": chat_service.async_flights.stats() if chat_service and chat_service.async_flights else None,
+                    "startup": runtime.status()})
+
+
+
+@app.route('/metrics', methods=["GET"])
+async def metrics():
+    # prometheus text format, per-stage latency histograms and token counters
+    return Response(REGISTRY.render(), content_type=REGISTRY.CONTENT_TYPE)
+
+
+
+@app.route('/healthz', methods=["GET"])
+async def healthz():
+    # liveness: the process is up and serving requests. A failed startup is never retried,
+    # so it reports unhealthy and the orchestrator restarts the process
+    if runtime.failed:
+        return jsonify({"status": "failed", "error": runtime.error}), 503
+    return jsonify({"status": "ok"})
+
+
+
+@app.route('/readyz', methods=["GET"])
+async def readyz():
+    return jsonify(runtime.status()), (200 if runtime.ready else 503)
+
+
+
+if __name__ == "__main__":
+    app.run()
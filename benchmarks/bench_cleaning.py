@@ -0,0 +1,154 @@
+"""
+Cleaning benchmark on a synthetic catalog shaped like the scraped csv files.
+
+Times DataCleaner end to end in memory and in chunks, its na handling against the previous
+per-cell version (three applymap passes, replace + fillna) and the numeric/currency normalization,
+checking that all produce the same data.
+
+    python -m benchmarks.bench_cleaning --rows 1000000
+    python -m benchmarks.bench_cleaning --rows 1000000 --chunk-size 200000 --skip-legacy
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_cleaning import DataCleaner
+
+
+BRANDS = ["Titan", "Casio", "Fastrack", "Park Avenue", "Pinkmint", "Sugathari", "C J Enterprise", "SGF11"]
+WORDS = ["Women's", "Men's", "Silk", "Cotton", "Saree", "Shirt", "Watch", "Analog", "Slim", "Fit",
+         "Banarasi", "Formal", "Casual", "Blue", "Black", "Dial", "Checks", "Printed"]
+CATEGORIES = ["sarees", "shirts", "watches"]
+
+
+
+def synthetic_catalog(directory: str, rows: int, na_rate: float, seed: int = 0, block_size: int = 100_000) -> None:
+    """
+    writes data_<category>.csv files with `rows` products in total, ~na_rate of the cells 'na'.
+    Written in blocks so generating the catalog doesn't inflate the peak memory being measured.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([" ".join(words) for words in rng.choice(WORDS, size=(4096, 6))])
+    per_file = rows // len(CATEGORIES)
+    for i, category in enumerate(CATEGORIES):
+        remaining = per_file + (rows % len(CATEGORIES) if i == 0 else 0)
+        path = os.path.join(directory, f"data_{category}.csv")
+        first = True
+        while remaining > 0:
+            n = min(block_size, remaining)
+            remaining -= n
+            price = rng.uniform(2, 200, n).round(2)
+            mrp = (price * rng.uniform(1.1, 5, n)).round(2)
+            symbol = np.where(rng.random(n) < 0.3, "₹", "£")
+            df = pd.DataFrame({
+                "Brand Name": rng.choice(BRANDS, n),
+                "Product Name": np.char.add(rng.choice(names, n), np.char.add(" (", np.char.add(
+                    rng.integers(0, 10 ** 6, n).astype(str), ")"))),
+                "Rating": np.char.add(rng.uniform(1, 5, n).round(1).astype(str), " out of 5 stars"),
+                "Rating Count": [f"{value:,}" for value in rng.integers(1, 100000, n)],
+                # a share of the rows still in rupees, as scraped from amazon.in
+                "Selling Price": np.char.add(symbol, price.astype(str)),
+                "MRP": np.char.add(symbol, mrp.astype(str)),
+                "Offer": np.char.add("(", np.char.add((100 - price / mrp * 100).astype(int).astype(str), "% off)")),
+            })
+            for column in ("Rating", "Rating Count", "MRP", "Offer"):
+                df.loc[rng.random(n) < na_rate, column] = "na"
+            df.to_csv(path, index=False, mode="w" if first else "a", header=first)
+            first = False
+
+
+
+def legacy_na_stage(df: pd.DataFrame) -> pd.DataFrame:
+    """the na handling before the single NA mask, kept here as the baseline"""
+    is_na = lambda x: str(x).strip().lower() == 'na'
+    df[df.map(is_na).any(axis=1)]                                   # check_for_na
+    df.map(is_na).sum()
+    df_without_na = df[~df.map(is_na).any(axis=1)]                  # find_mode
+    cols = df.select_dtypes(include=['object', 'category']).columns
+    modes = {col: df_without_na[col].mode()[0] for col in cols}
+    df = df.replace('na', pd.NA)                                    # handling_na
+    for col in cols:
+        df[col] = df[col].fillna(modes[col])
+    return df
+
+
+
+def vectorized_na_stage(cleaner: DataCleaner, df: pd.DataFrame) -> pd.DataFrame:
+    mask = cleaner.na_mask(df)
+    cleaner.check_for_na(df, mask)
+    cols, modes = cleaner.find_mode(df, mask)
+    return cleaner.impute(df, cols, modes, mask)
+
+
+
+def timed(name: str, fn) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<22} {elapsed:8.2f}s   max rss {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.1f} MB")
+    return elapsed
+
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the data cleaning stage")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--na-rate", type=float, default=0.02)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the slow per-cell baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-cleaning-") as workdir:
+        input_path = os.path.join(workdir, "data")
+        os.makedirs(input_path)
+        start = time.perf_counter()
+        synthetic_catalog(input_path, args.rows, args.na_rate)
+        print(f"synthetic catalog: {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        cleaner = DataCleaner()
+        config = cleaner.data_cleaner_config
+        config.input_path = input_path
+        config.catalog_path = os.path.join(workdir, "data_cleaned.parquet")     # not the real artifact
+        outputs = {}
+
+        # chunked first, max rss only grows so it is read before the in-memory runs
+        config.output_path = outputs["chunked"] = os.path.join(workdir, "chunked.csv")
+        config.chunk_size = args.chunk_size
+        timed(f"chunked ({args.chunk_size} rows)", cleaner.clean_data)
+
+        config.output_path = outputs["vectorized"] = os.path.join(workdir, "vectorized.csv")
+        config.chunk_size = 0
+        timed("vectorized", cleaner.clean_data)
+
+        # the na handling alone, on the loaded frame (loading and writing the csv cost the same in both)
+        df = cleaner.load_data(input_path)
+        result = {}
+        vectorized_stage = timed("na stage, vectorized", lambda: result.update(vectorized=vectorized_na_stage(cleaner, df)))
+        timed("normalize values", lambda: cleaner.normalize_values(result["vectorized"]))
+        if not args.skip_legacy:
+            legacy_stage = timed("na stage, legacy", lambda: result.update(legacy=legacy_na_stage(df)))
+            print(f"  na stage speedup       {legacy_stage / vectorized_stage:8.1f}x")
+            if not result["legacy"].equals(result["vectorized"]):
+                print("  legacy and vectorized na stages differ")
+                sys.exit(1)
+
+        reference = pd.read_csv(outputs["vectorized"], dtype=str)
+        for name, path in outputs.items():
+            if name != "vectorized" and not reference.equals(pd.read_csv(path, dtype=str)):
+                print(f"  output of {name} differs from vectorized")
+                sys.exit(1)
+        print("  outputs identical")
+
+
+
+if __name__ == "__main__":
+    main()
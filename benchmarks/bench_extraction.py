@@ -0,0 +1,90 @@
+"""
+Product extraction benchmark on saved result pages.
+
+Times parse_products_html (one lxml pass over the page source) per page, on fixture pages
+written by benchmarks.scrape_fixtures or on real pages saved from amazon.in (--html-dir).
+With --driver the pages are also opened in headless chrome, and the per-element WebDriver
+extraction is timed against page_source + parse on the same pages and checked to read the
+same rows. Fixture pages are also checked against the rows they were generated from.
+
+    python -m benchmarks.bench_extraction --pages 20
+    python -m benchmarks.bench_extraction --html-dir saved_pages --driver --implicit-wait 10
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import List
+
+from benchmarks.scrape_fixtures import fixture_rows, save_fixtures
+from src.components import scraper
+
+
+
+def report(name: str, timings: List[float], results: List[list]) -> None:
+    print(f"  {name:<24} {statistics.median(timings):9.2f} ms/page (median)   {max(timings):9.2f} ms max"
+          f"   {sum(len(rows) for rows in results)} products")
+
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark product extraction on saved result pages")
+    parser.add_argument("--html-dir", help="saved result pages (*.html), fixture pages are generated when omitted")
+    parser.add_argument("--pages", type=int, default=20, help="fixture pages to generate")
+    parser.add_argument("--products-per-page", type=int, default=48)
+    parser.add_argument("--driver", action="store_true", help="also time the per-element WebDriver extraction (needs chrome)")
+    parser.add_argument("--implicit-wait", type=float, default=10,
+                        help="implicit wait of the driver, 10 is what scrape_products sets")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-extraction-") as workdir:
+        keyword = "Mens formal shirts"
+        if args.html_dir:
+            paths = sorted(glob.glob(os.path.join(args.html_dir, "*.html")))
+        else:
+            paths = save_fixtures(workdir, keyword, args.pages, args.products_per_page)
+        print(f"{len(paths)} pages")
+
+        parsed, timings = [], []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                page_source = f.read()
+            start = time.perf_counter()
+            parsed.append(scraper.parse_products_html(page_source))
+            timings.append((time.perf_counter() - start) * 1000)
+        report("html (lxml)", timings, parsed)
+
+        if not args.html_dir:
+            for page, rows in enumerate(parsed, 1):
+                if rows != fixture_rows(keyword, page, args.products_per_page):
+                    print(f"  page {page}: parsed rows differ from the fixture rows")
+                    sys.exit(1)
+            print("  parsed rows match the fixtures")
+
+        if args.driver:
+            driver, user_data_dir = scraper.create_driver(headless=True, implicit_wait=args.implicit_wait)
+            try:
+                results = {}
+                for mode in ("elements", "html"):
+                    results[mode], timings = [], []
+                    for path in paths:
+                        driver.get(Path(path).resolve().as_uri())        # loading isn't timed, only extraction
+                        start = time.perf_counter()
+                        results[mode].append(scraper.extract_products(driver, mode))
+                        timings.append((time.perf_counter() - start) * 1000)
+                    report(f"{mode} (driver)", timings, results[mode])
+                if results["elements"] != results["html"]:
+                    print("  elements and html extraction read different rows")
+                    sys.exit(1)
+                print("  elements and html extraction read the same rows")
+            finally:
+                scraper.close_driver(driver, user_data_dir)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Chat history backend check and benchmark.
+
+Runs the memory, sqlite (temporary file) and redis backends through the same chat turns from
+several threads, with two factories standing in for two worker processes. Checks that every
+backend keeps the last max_messages messages, that a turn written by one worker is read by
+the other, and that idle sessions expire (and are pruned from sqlite). Redis runs against the
+in-process LocalRedis stand-in unless --redis-url points at a server.
+
+    python -m benchmarks.bench_history --sessions 200 --turns 10
+    python -m benchmarks.bench_history --redis-url redis://localhost:6379/15
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.utils.session_store import SessionStore, SessionStoreConfig
+from src.utils.chat_history_backends import (HistoryBackendConfig, LocalRedis, SQLiteChatMessageHistory,
+                                             build_history_factory, history_metrics)
+
+
+
+def backend_config(backend: str, workdir: str, args) -> HistoryBackendConfig:
+    config = HistoryBackendConfig()
+    config.backend = backend
+    config.sqlite_path = os.path.join(workdir, "chat_history.sqlite")
+    config.redis_url = args.redis_url
+    config.key_prefix = f"bench_history:{os.getpid()}:"
+    config.max_messages = args.max_messages
+    config.idle_ttl_seconds = args.ttl
+    config.prune_interval_seconds = 0
+    config.cache_ttl_seconds = 0              # the second worker must see the first one's writes
+    return config
+
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        print(f"  FAILED: {message}")
+        sys.exit(1)
+
+
+
+def run_backend(backend: str, workdir: str, args) -> None:
+    config = backend_config(backend, workdir, args)
+    store_config = SessionStoreConfig()
+    store_config.max_messages, store_config.idle_ttl_seconds = args.max_messages, args.ttl
+    session_store = SessionStore(store_config)
+    redis_client = None
+    if backend == "redis":
+        # both workers share one client, like two processes talking to one server
+        if config.redis_url.startswith("memory://"):
+            redis_client = LocalRedis()
+        else:
+            import redis
+            redis_client = redis.Redis.from_url(config.redis_url)
+    workers = [build_history_factory(config, session_store, redis_client) for _ in range(2)]
+
+    sessions = [f"bench-session-{i:06d}" for i in range(args.sessions)]
+    turn_seconds = []
+
+    def chat(session_id: str) -> None:
+        for turn in range(args.turns):
+            worker = workers[turn % 2]                  # follow-ups land on alternating workers
+            start = time.perf_counter()
+            history = worker(session_id)
+            history.messages
+            history.add_messages([HumanMessage(f"question {turn}"), AIMessage(f"answer {turn}")])
+            turn_seconds.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(chat, sessions))
+    elapsed = time.perf_counter() - start
+
+    expected = min(2 * args.turns, args.max_messages)
+    for session_id in sessions[:20]:
+        for worker in workers:
+            messages = worker(session_id).messages
+            check(len(messages) == expected, f"{backend}: {len(messages)} messages kept, expected {expected}")
+            check(messages[-1].content == f"answer {args.turns - 1}", f"{backend}: last turn missing")
+
+    timings = sorted(turn_seconds)
+    print(f"  {backend:<8} {len(timings) / elapsed:9.0f} turns/s   p50 {statistics.median(timings) * 1000:6.2f} ms"
+          f"   p99 {timings[int(len(timings) * 0.99) - 1] * 1000:6.2f} ms   {history_metrics(config, session_store)}")
+
+    # idle sessions read as empty once the ttl passed, sqlite deletes them on the next write
+    time.sleep(args.ttl + 1)
+    workers[0]("bench-session-fresh").add_messages([HumanMessage("hello"), AIMessage("hi")])
+    check(not workers[1](sessions[0]).messages, f"{backend}: idle session still readable after the ttl")
+    if backend == "sqlite":
+        metrics = SQLiteChatMessageHistory.metrics(config.sqlite_path, config.idle_ttl_seconds)
+        check(metrics["stored_sessions"] == 1, f"sqlite: idle sessions not pruned ({metrics})")
+    if backend == "redis":
+        redis_client.delete(*[config.key_prefix + session_id for session_id in sessions + ["bench-session-fresh"]])
+    print(f"  {backend:<8} idle sessions expired")
+
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Check and benchmark the chat history backends")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "redis"])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-messages", type=int, default=6)
+    parser.add_argument("--ttl", type=int, default=2, help="idle ttl in seconds for the expiry check")
+    parser.add_argument("--redis-url", default="memory://", help="memory:// uses the in-process stand-in")
+    args = parser.parse_args(argv)
+
+    print(f"{args.sessions} sessions x {args.turns} turns on {args.threads} threads")
+    with tempfile.TemporaryDirectory(prefix="bench-history-") as workdir:
+        for backend in args.backends:
+            run_backend(backend, workdir, args)
+    print("  all backends passed")
+
+
+
+if __name__ == "__main__":
+    main()
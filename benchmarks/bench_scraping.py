@@ -0,0 +1,65 @@
+"""
+Scraping benchmark against locally served fixture pages (benchmarks.scrape_fixtures).
+
+Runs the parallel collector over the products_config keywords at each concurrency, with
+--latency-ms standing in for amazon's response time, and checks every run read exactly
+the fixture rows. Needs chrome and chromedriver (CHROMEDRIVER_PATH).
+
+    python -m benchmarks.bench_scraping --products 480 --concurrency 1 2 4 8 --latency-ms 500
+"""
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+from benchmarks.scrape_fixtures import fixture_rows, serve_fixtures
+from src.components.data_collection import products_config
+from src.components.parallel_scraper import ParallelScraper, ParallelScraperConfig
+
+
+
+def expected_frame(keyword: str, num_products: int, products_per_page: int) -> pd.DataFrame:
+    rows, page = [], 1
+    while len(rows) < num_products:
+        rows.extend(fixture_rows(keyword, page, products_per_page))
+        page += 1
+    return pd.DataFrame(rows[:num_products])
+
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the parallel scraper on fixture pages")
+    parser.add_argument("--products", type=int, default=480, help="products per keyword")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--products-per-page", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    args = parser.parse_args(argv)
+
+    products = [dict(product, num_products=args.products) for product in products_config]
+    pages = -(-args.products // args.products_per_page)
+    expected = {product["keyword"]: expected_frame(product["keyword"], args.products, args.products_per_page)
+                for product in products}
+
+    with serve_fixtures(pages=pages, products_per_page=args.products_per_page, latency_ms=args.latency_ms) as base_url:
+        print(f"{len(products)} keywords x {args.products} products ({pages} pages each) from {base_url}")
+        baseline = None
+        for concurrency in args.concurrency:
+            config = ParallelScraperConfig(concurrency=concurrency, base_url=base_url,
+                                           products_per_page=args.products_per_page)
+            start = time.perf_counter()
+            results = ParallelScraper(config).scrape(products)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"  concurrency {concurrency:<3} {elapsed:8.2f}s   {len(products) * pages / elapsed:6.2f} pages/s"
+                  f"   speedup {baseline / elapsed:5.2f}x")
+            for keyword, frame in expected.items():
+                if keyword not in results or not results[keyword].equals(frame):
+                    print(f"  scraped rows for {keyword} differ from the fixtures")
+                    sys.exit(1)
+        print("  all runs read the fixture rows")
+
+
+
+if __name__ == "__main__":
+    main()
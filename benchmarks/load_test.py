@@ -0,0 +1,432 @@
+"""
+Load generator for the chat endpoints.
+
+Replays questions against the flask app, the quart app (both in-process with MODEL_PROVIDER=local,
+so no api keys or network are needed) or a running server, either at a fixed concurrency (closed
+loop) or at a target request rate (open loop), and reports latency percentiles, throughput,
+error rate and memory.
+
+    python -m benchmarks.load_test --target flask --concurrency 16 --requests 500
+    python -m benchmarks.load_test --target async --endpoint stream --qps 50 --duration 30
+    python -m benchmarks.load_test --url http://localhost:8080 --questions requests.jsonl --qps 5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.questions import load_questions
+
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+
+@dataclass
+class RequestResult:
+    ok: bool
+    latency: float
+    ttfb: Optional[float] = None
+    status: int = 0
+    error: str = ""
+
+
+
+class MemorySampler:
+    """samples the resident set size of a process (this one by default) in the background"""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.1):
+        self.path = f"/proc/{pid or 'self'}/statm"
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+
+    def rss(self) -> Optional[int]:
+        try:
+            with open(self.path) as f:
+                return int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            return None
+
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = self.rss()
+            if rss is not None:
+                self.samples.append(rss)
+
+
+    def start(self) -> "MemorySampler":
+        self._thread.start()
+        return self
+
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        mb = 1024 * 1024
+        report = {"rss_start_mb": round(self.samples[0] / mb, 1) if self.samples else None,
+                  "rss_end_mb": round(self.samples[-1] / mb, 1) if self.samples else None,
+                  "rss_peak_mb": round(max(self.samples) / mb, 1) if self.samples else None}
+        if self.path == "/proc/self/statm":
+            # ru_maxrss is in KB on linux
+            report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return report
+
+
+
+def parse_sse(body: str) -> Optional[str]:
+    """error message of an event stream, None when it completed"""
+    for block in body.split("\n\n"):
+        if block.startswith("event: error"):
+            return block.split("data: ", 1)[-1]
+    return None
+
+
+
+# ---------------------------------------------------------------------------------------------
+# in-process targets: the real app with the local providers and a local index built from the catalog
+# ---------------------------------------------------------------------------------------------
+
+def setup_local_providers(args) -> None:
+    """must run before the app is imported, the app reads its configuration at import time"""
+    workdir = tempfile.mkdtemp(prefix="chatbot-bench-")
+    index_path = os.path.join(workdir, "vector_index")
+    os.environ.update({"MODEL_PROVIDER": "local",
+                       "LOCAL_EMBEDDING_LATENCY_MS": str(args.embedding_latency_ms),
+                       "LOCAL_LLM_TTFT_MS": str(args.llm_ttft_ms),
+                       "LOCAL_LLM_TOKEN_LATENCY_MS": str(args.llm_token_latency_ms),
+                       "VECTORSTORE_BACKEND": "local",
+                       "LOCAL_INDEX_PATH": index_path,
+                       "INDEX_VERSION_PATH": os.path.join(workdir, "index_version.json"),
+                       "CHAT_HISTORY_BACKEND": "memory"})
+    if not args.semantic_cache:
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+
+    from src.components.vectorstore_builder import VectorStoreBuilder
+    from src.utils.catalog import resolve_catalog_path
+    from src.utils.local_providers import HashingEmbeddings, LocalProviderConfig
+    from src.utils.local_vectorstore import LocalVectorStore
+
+    catalog_path = resolve_catalog_path(os.getenv("CATALOG_PATH", "artifacts/data_cleaned.parquet"))
+    documents = list(VectorStoreBuilder().iter_documents([catalog_path]))
+    store = LocalVectorStore(embedding=HashingEmbeddings(LocalProviderConfig().embedding_dimensions))
+    store.add_texts([doc.page_content for doc in documents],
+                    metadatas=[doc.metadata for doc in documents],
+                    ids=[doc.id for doc in documents])
+    store.save(index_path)
+
+
+
+class FlaskTarget:
+    def __init__(self, app, endpoint: str, workers: int):
+        self.app = app
+        self.endpoint = endpoint
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bench")
+
+
+    def _request(self, question: str) -> RequestResult:
+        start = time.perf_counter()
+        client = self.app.test_client()                       # new client, new session
+        response = client.post(self.endpoint, json={"input": question}, buffered=False)
+        ttfb, chunks = None, []
+        for chunk in response.response:
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode())
+        response.close()
+        latency = time.perf_counter() - start
+        body = b"".join(chunks).decode("utf-8", errors="replace")
+        error = parse_sse(body) if self.endpoint.endswith("stream") else None
+        return RequestResult(ok=response.status_code == 200 and error is None, latency=latency,
+                             ttfb=ttfb, status=response.status_code,
+                             error=error or ("" if response.status_code == 200 else body[:200]))
+
+
+    async def request(self, question: str) -> RequestResult:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._request, question)
+
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+
+class QuartTarget:
+    def __init__(self, app, endpoint: str):
+        self.app = app
+        self.endpoint = endpoint
+
+
+    async def request(self, question: str) -> RequestResult:
+        start = time.perf_counter()
+        client = self.app.test_client()
+        async with client.request(self.endpoint, method="POST",
+                                  headers={"Content-Type": "application/json"}) as connection:
+            await connection.send(json.dumps({"input": question}).encode())
+            await connection.send_complete()
+            first_chunk = await connection.receive()
+            ttfb = time.perf_counter() - start
+        # leaving the block waits for the response to finish and collects the rest of the body
+        latency = time.perf_counter() - start
+        status = connection.status_code
+        body = (first_chunk + bytes(connection.response_data)).decode("utf-8", errors="replace")
+        error = parse_sse(body) if self.endpoint.endswith("stream") else None
+        return RequestResult(ok=status == 200 and error is None, latency=latency, ttfb=ttfb, status=status,
+                             error=error or ("" if status == 200 else body[:200]))
+
+
+    async def close(self) -> None:
+        pass
+
+
+
+class HttpTarget:
+    """a running server; one keep-alive pool, a fresh client (and so a fresh session cookie) per request"""
+
+    def __init__(self, url: str, endpoint: str, workers: int, timeout: float):
+        import httpx
+        self.httpx = httpx
+        self.url = url.rstrip("/")
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=workers,
+                                                                      max_keepalive_connections=workers))
+
+
+    async def request(self, question: str) -> RequestResult:
+        start = time.perf_counter()
+        # the client is not closed on purpose, closing it would close the shared transport
+        client = self.httpx.AsyncClient(base_url=self.url, transport=self.transport, timeout=self.timeout)
+        try:
+            async with client.stream("POST", self.endpoint, json={"input": question}) as response:
+                ttfb, chunks = None, []
+                async for chunk in response.aiter_bytes():
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    chunks.append(chunk)
+        except self.httpx.HTTPError as e:
+            return RequestResult(ok=False, latency=time.perf_counter() - start, error=repr(e))
+        latency = time.perf_counter() - start
+        body = b"".join(chunks).decode("utf-8", errors="replace")
+        error = parse_sse(body) if self.endpoint.endswith("stream") else None
+        return RequestResult(ok=response.status_code == 200 and error is None, latency=latency, ttfb=ttfb,
+                             status=response.status_code,
+                             error=error or ("" if response.status_code == 200 else body[:200]))
+
+
+    async def close(self) -> None:
+        await self.transport.aclose()
+
+
+
+# ---------------------------------------------------------------------------------------------
+# load generation
+# ---------------------------------------------------------------------------------------------
+
+class QuestionFeed:
+    def __init__(self, questions: List[str], shuffle: bool, seed: int):
+        self.questions = list(questions)
+        if shuffle:
+            random.Random(seed).shuffle(self.questions)
+        self.position = 0
+
+
+    def next(self) -> str:
+        question = self.questions[self.position % len(self.questions)]
+        self.position += 1
+        return question
+
+
+
+async def timed(target, question: str) -> RequestResult:
+    start = time.perf_counter()
+    try:
+        return await target.request(question)
+    except Exception as e:
+        return RequestResult(ok=False, latency=time.perf_counter() - start, error=repr(e))
+
+
+
+async def run_closed_loop(target, feed: QuestionFeed, concurrency: int,
+                          total: Optional[int], duration: Optional[float]) -> List[RequestResult]:
+    """`concurrency` users, each sends its next question as soon as the previous one is answered"""
+    results: List[RequestResult] = []
+    end = time.perf_counter() + duration if duration else None
+    issued = 0
+
+    async def user():
+        nonlocal issued
+        while (total is None or issued < total) and (end is None or time.perf_counter() < end):
+            issued += 1
+            results.append(await timed(target, feed.next()))
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return results
+
+
+
+async def run_open_loop(target, feed: QuestionFeed, qps: float,
+                        total: Optional[int], duration: Optional[float]) -> List[RequestResult]:
+    """requests start on a fixed schedule whether or not earlier ones finished, like real traffic"""
+    count = total if total is not None else int(qps * duration)
+    start = time.perf_counter()
+    tasks = []
+    for i in range(count):
+        delay = start + i / qps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(target, feed.next())))
+    return list(await asyncio.gather(*tasks))
+
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50) * 1000, 1), "p95": round(float(p95) * 1000, 1),
+            "p99": round(float(p99) * 1000, 1), "max": round(max(values) * 1000, 1)}
+
+
+
+def build_report(results: List[RequestResult], elapsed: float, memory: Dict[str, Any], args) -> Dict[str, Any]:
+    ok = [result for result in results if result.ok]
+    errors = {}
+    for result in results:
+        if not result.ok:
+            key = " ".join(f"{result.status} {result.error}".split())[:100]
+            errors[key] = errors.get(key, 0) + 1
+    return {"target": args.url or args.target,
+            "endpoint": args.endpoint,
+            "mode": f"qps={args.qps}" if args.qps else f"concurrency={args.concurrency}",
+            "requests": len(results),
+            "errors": len(results) - len(ok),
+            "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else None,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+            "latency_ms": percentiles([result.latency for result in ok]),
+            "ttfb_ms": percentiles([result.ttfb for result in ok if result.ttfb is not None]),
+            "memory": memory,
+            "error_samples": dict(sorted(errors.items(), key=lambda item: -item[1])[:5])}
+
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['target']} {report['endpoint']} ({report['mode']})")
+    print(f"  requests     {report['requests']} in {report['elapsed_s']}s, "
+          f"{report['errors']} errors ({(report['error_rate'] or 0) * 100:.2f}%)")
+    print(f"  throughput   {report['throughput_rps']} req/s")
+    for name in ("latency_ms", "ttfb_ms"):
+        values = report[name]
+        if values["p50"] is not None:
+            print(f"  {name:<12} p50 {values['p50']}  p95 {values['p95']}  p99 {values['p99']}  max {values['max']}")
+    memory = ", ".join(f"{key} {value}" for key, value in report["memory"].items() if value is not None)
+    print(f"  memory       {memory}")
+    for error, count in report["error_samples"].items():
+        print(f"  error x{count}: {error}")
+
+
+
+async def run(args) -> Dict[str, Any]:
+    feed = QuestionFeed(load_questions(args.questions), shuffle=args.shuffle, seed=args.seed)
+    endpoint = "/chat/stream" if args.endpoint == "stream" else "/chat"
+    workers = args.concurrency if not args.qps else max(64, int(args.qps * 10))
+
+    quart_app = None
+    if args.url:
+        target = HttpTarget(args.url, endpoint, workers, args.timeout)
+    else:
+        setup_local_providers(args)
+        if args.target == "flask":
+            from app import app, runtime
+            target = FlaskTarget(app, endpoint, workers)
+        else:
+            from async_app import app, runtime
+            quart_app = app.test_app()
+            await quart_app.startup()                         # runs before_serving, which starts the runtime
+            target = QuartTarget(app, endpoint)
+        started = time.perf_counter()
+        if not await asyncio.to_thread(runtime.wait_ready, args.timeout):
+            raise RuntimeError(f"Chatbot did not become ready: {runtime.status()}")
+        print(f"chatbot ready in {time.perf_counter() - started:.2f}s")
+
+    try:
+        if args.warmup:
+            await run_closed_loop(target, QuestionFeed(feed.questions, False, args.seed),
+                                  min(args.concurrency, args.warmup), args.warmup, None)
+        sampler = MemorySampler(pid=args.server_pid if args.url else None).start()
+        start = time.perf_counter()
+        if args.qps:
+            results = await run_open_loop(target, feed, args.qps, args.requests, args.duration)
+        else:
+            results = await run_closed_loop(target, feed, args.concurrency, args.requests, args.duration)
+        elapsed = time.perf_counter() - start
+        return build_report(results, elapsed, sampler.stop(), args)
+    finally:
+        await target.close()
+        if quart_app is not None:
+            await quart_app.shutdown()
+
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the chatbot /chat and /chat/stream endpoints")
+    parser.add_argument("--target", choices=("flask", "async"), default="flask",
+                        help="in-process app to drive with the local providers (ignored with --url)")
+    parser.add_argument("--url", help="base url of a running server instead of an in-process app")
+    parser.add_argument("--server-pid", type=int, help="pid of the server behind --url, to sample its memory")
+    parser.add_argument("--endpoint", choices=("chat", "stream"), default="chat")
+    parser.add_argument("--questions", default="Logs",
+                        help="JSONL file (input/question/query/title field) or a Logs/ directory")
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="closed loop: number of concurrent users")
+    load.add_argument("--qps", type=float, help="open loop: requests started per second")
+    parser.add_argument("--requests", type=int, help="number of requests to send")
+    parser.add_argument("--duration", type=float, help="seconds to run for")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=120.0)
+
+    local = parser.add_argument_group("local providers (in-process targets)")
+    local.add_argument("--embedding-latency-ms", type=float, default=30.0)
+    local.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    local.add_argument("--llm-token-latency-ms", type=float, default=10.0)
+    local.add_argument("--semantic-cache", action="store_true", help="keep the semantic answer cache on")
+
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 200
+    return args
+
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["requests"] and report["error_rate"] == 1 else 0)
+
+
+
+if __name__ == "__main__":
+    main()
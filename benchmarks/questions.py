@@ -0,0 +1,49 @@
+import os
+import re
+import json
+from typing import List
+
+
+USER_INPUT_REGEX = re.compile(r"User Input: (.*)$")
+
+# keys tried in order for each JSONL record
+QUESTION_KEYS = ("input", "question", "query", "title")
+
+
+def questions_from_jsonl(path: str) -> List[str]:
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                questions.append(record)
+                continue
+            question = next((record[key] for key in QUESTION_KEYS if record.get(key)), None)
+            if question:
+                questions.append(str(question))
+    return questions
+
+
+def questions_from_logs(path: str) -> List[str]:
+    """replays real traffic: every "User Input: ..." line in the log files under path"""
+    questions = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.endswith(".log"):
+                continue
+            with open(os.path.join(root, name), encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = USER_INPUT_REGEX.search(line.rstrip("\n"))
+                    if match and match.group(1).strip():
+                        questions.append(match.group(1).strip())
+    return questions
+
+
+def load_questions(path: str) -> List[str]:
+    questions = questions_from_logs(path) if os.path.isdir(path) else questions_from_jsonl(path)
+    if not questions:
+        raise ValueError(f"No questions found in {path}")
+    return questions
@@ -0,0 +1,158 @@
+"""
+Amazon-like search result pages for exercising the scrapers offline.
+
+Pages are generated deterministically from (keyword, page) with the card markup the scraper's
+xpaths expect, including cards with missing fields, and served at /s?k=<keyword>&page=<n> like
+amazon.in. Pages past `pages` have no product cards, which ends a keyword.
+
+    python -m benchmarks.scrape_fixtures --port 8765 --latency-ms 300
+    SCRAPER_BASE_URL=http://127.0.0.1:8765 python -m src.main
+"""
+import os
+import html
+import time
+import zlib
+import argparse
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+BRANDS = ["Titan", "Casio", "Fastrack", "Park Avenue", "Pinkmint", "Sugathari", "C J Enterprise", "SGF11"]
+WORDS = ["Women's", "Men's", "Silk", "Cotton", "Saree", "Shirt", "Watch", "Analog", "Slim", "Fit",
+         "Banarasi", "Formal", "Casual", "Blue", "Black", "Dial", "Checks", "Printed"]
+
+
+
+def fixture_rows(keyword: str, page: int, products_per_page: int = 48) -> List[Dict[str, str]]:
+    """the rows a scraper should read from a fixture page, 'na' where the card lacks the field"""
+    rng = np.random.default_rng(zlib.crc32(f"{keyword}|{page}".encode("utf-8")))
+    rows = []
+    for i in range(products_per_page):
+        price = int(rng.integers(199, 5000))
+        mrp = int(price * rng.uniform(1.1, 4))
+        row = {"Brand Name": str(rng.choice(BRANDS)),
+               "Product Name": f"{' '.join(rng.choice(WORDS, 5))} ({keyword} p{page}-{i})",
+               "Rating": f"{rng.uniform(1, 5):.1f} out of 5 stars",
+               "Rating Count": f"{int(rng.integers(1, 100000)):,}",
+               "Selling Price": f"₹{price:,}",
+               "MRP": f"₹{mrp:,}",
+               "Offer": f"({100 - price * 100 // mrp}% off)"}
+        # new listings without reviews and products sold at their mrp
+        if rng.random() < 0.1:
+            row["Rating"] = row["Rating Count"] = "na"
+        if rng.random() < 0.1:
+            row["MRP"] = row["Offer"] = "na"
+        rows.append(row)
+    return rows
+
+
+
+def render_card(row: Dict[str, str]) -> str:
+    text = {column: html.escape(value) for column, value in row.items()}
+    parts = ['<div class="puis-card-container"><div class="a-section a-spacing-base">',
+             f'<div class="a-row"><h2 class="a-size-mini s-line-clamp-1"><span class="a-size-base-plus a-color-base">{text["Brand Name"]}</span></h2></div>',
+             f'<a class="a-link-normal" href="#"><h2 class="a-size-base-plus a-spacing-none a-color-base a-text-normal"><span>{text["Product Name"]}</span></h2></a>']
+    if row["Rating"] != "na":
+        parts.append(f'<div class="a-row a-size-small"><i data-cy="reviews-ratings-slot" class="a-icon a-icon-star-small">'
+                     f'<span class="a-icon-alt">{text["Rating"]}</span></i>'
+                     f'<a href="#"><span class="a-size-base s-underline-text">{text["Rating Count"]}</span></a></div>')
+    parts.append(f'<div class="a-row"><span class="a-price"><span class="a-offscreen">{text["Selling Price"]}</span>'
+                 f'<span aria-hidden="true">{text["Selling Price"]}</span></span>')
+    if row["MRP"] != "na":
+        parts.append(f'<span class="a-price a-text-price"><span class="a-offscreen">{text["MRP"]}</span>'
+                     f'<span aria-hidden="true">{text["MRP"]}</span></span></div>'
+                     f'<div class="a-row"><span>{text["Offer"]}</span></div>')
+    else:
+        parts.append('</div>')
+    parts.append('</div></div>')
+    return "".join(parts)
+
+
+
+def fixture_page(keyword: str, page: int, pages: int = 50, products_per_page: int = 48) -> str:
+    rows = fixture_rows(keyword, page, products_per_page) if 1 <= page <= pages else []
+    cards = "\n".join(render_card(row) for row in rows)
+    return (f'<!doctype html><html><head><meta charset="utf-8"><title>Amazon.in : {html.escape(keyword)}</title></head>'
+            f'<body><div id="a-page"><header><input id="twotabsearchtextbox" value="{html.escape(keyword)}"></header>'
+            f'<div class="s-main-slot s-result-list">\n{cards}\n</div>'
+            f'<span class="s-pagination-strip">Page {page}</span></div></body></html>')
+
+
+
+def save_fixtures(directory: str, keyword: str, pages: int, products_per_page: int = 48) -> List[str]:
+    """writes pages 1..pages of `keyword` as html files, for benchmarking extraction on saved pages"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for page in range(1, pages + 1):
+        path = os.path.join(directory, f"{'_'.join(keyword.lower().split())}_page_{page}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(fixture_page(keyword, page, pages, products_per_page))
+        paths.append(path)
+    return paths
+
+
+
+def make_handler(pages: int, products_per_page: int, latency_ms: float):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path.rstrip("/") != "/s" or "k" not in query:
+                self.send_error(404)
+                return
+            if latency_ms:
+                time.sleep(latency_ms / 1000)           # server and render time of a real results page
+            body = fixture_page(query["k"][0], int(query.get("page", ["1"])[0]), pages, products_per_page).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+
+@contextlib.contextmanager
+def serve_fixtures(port: int = 0, pages: int = 50, products_per_page: int = 48,
+                   latency_ms: float = 0.0) -> Iterator[str]:
+    """serves fixture pages in a background thread, yields the base url to point the scraper at"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(pages, products_per_page, latency_ms))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve amazon-like search result fixture pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=50, help="result pages per keyword")
+    parser.add_argument("--products-per-page", type=int, default=48)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    with serve_fixtures(args.port, args.pages, args.products_per_page, args.latency_ms) as base_url:
+        print(f"serving fixture pages at {base_url}/s?k=<keyword>&page=<n>, ctrl-c to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+
+if __name__ == "__main__":
+    main()
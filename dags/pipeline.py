@@ -13,6 +13,7 @@ from src.components.vectorstore_builder import VectorStoreBuilder
 from src.components.chatbot_builder import ChatbotBuilder
 
 from langchain_pinecone import PineconeVectorStore
+from src.utils.local_vectorstore import LocalVectorStore
 
 default_args = {
     'owner': 'airflow',
@@ -45,10 +46,13 @@ def build_vectorstore():                                # creating the vectorsto
 def build_chatbot():
     pipeline = VectorStoreBuilder()                     # loading the created vectorstore as we don't want to pass the result from one task to another 
     embeddings = pipeline.create_embeddings()
-    vector_store = PineconeVectorStore.from_existing_index(
-        index_name="ecommerce-chatbot-project", 
-        embedding=embeddings
-    )
+    if pipeline.vectorstore_builder_config.backend == "local":
+        vector_store = LocalVectorStore.load(pipeline.vectorstore_builder_config.local_index_path, embeddings)
+    else:
+        vector_store = PineconeVectorStore.from_existing_index(
+            index_name="ecommerce-chatbot-project", 
+            embedding=embeddings
+        )
    
     ChatbotBuilder().build_chatbot(vector_store)
 
@@ -11,6 +11,7 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 from langchain_pinecone import PineconeVectorStore
 
+from src.utils.local_providers import LocalProviderConfig, local_chat_model
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 from dotenv import load_dotenv
@@ -20,13 +21,18 @@ load_dotenv()
 
 class ChatbotBuilder:
     def __init__(self):
+        self.provider_config = LocalProviderConfig()
         self.api_key = os.getenv("GROQ_API_KEY")
-        if not self.api_key:
+        if not self.api_key and not self.provider_config.is_local:
             raise ValueError("GROQ_API_KEY environment variable not set")
         
 
     def create_llm(self):
         try:
+            if self.provider_config.is_local:
+                logging.info("Initializing local template chat model (MODEL_PROVIDER=local)")
+                return local_chat_model(self.provider_config)
+
             logging.info("Initializing Llama2 model with Groq")
 
             #ChatGroq.model_rebuild()
@@ -1,12 +1,15 @@
 import sys
 import os
+import json
 import pandas as pd
-from pandas import DataFrame  
+from pandas import DataFrame
 from dataclasses import dataclass
-import numpy as np 
+from typing import Dict, Iterator, List, Optional
+import numpy as np
 import glob
 
-from src.utils.logger import logging 
+from src.utils.catalog import CatalogWriter, PRICE_COLUMNS, render_fields, typed_catalog, write_catalog
+from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 
 
@@ -16,27 +19,89 @@ class DataCleaningConfig:
 
     if is_airflow:
         input_path = "/opt/airflow/data/"
-        output_path = "/opt/airflow/artifacts/data_cleaned.csv" 
+        output_path = "/opt/airflow/artifacts/data_cleaned.csv"
+        catalog_path = "/opt/airflow/artifacts/data_cleaned.parquet"
     else:
         input_path = "data"
-        output_path = "artifacts/data_cleaned.csv" 
+        output_path = "artifacts/data_cleaned.csv"                 # for humans
+        catalog_path = "artifacts/data_cleaned.parquet"            # typed, read by the vector store and lexical index
+
+    # rows per chunk for catalogs that don't fit in memory, 0 cleans everything in one frame
+    chunk_size = int(os.getenv("CLEANING_CHUNK_SIZE", "0"))
+    # distinct values counted per column for its mode in chunked mode, a column past it keeps its 'na' cells
+    max_mode_values = int(os.getenv("CLEANING_MAX_MODE_VALUES", "100000"))
+
+    # prices are converted to this currency. Rates are the value of one unit in GBP, prices in a
+    # currency without a rate are kept as they are and tagged with their own currency
+    currency = os.getenv("CATALOG_CURRENCY", "GBP").upper()
+    fx_rates = json.loads(os.getenv("FX_RATES", '{"GBP": 1.0, "INR": 0.0095}'))
+
+    def __post_init__(self):
+        if self.currency not in self.fx_rates:
+            raise ValueError(f"CATALOG_CURRENCY {self.currency} has no rate in FX_RATES")
+
+
+
+NA_TOKEN = "na"
+
+# scraped price prefixes, a price without one is taken to be in the catalog currency already
+PRICE_PATTERN = r"(?P<symbol>₹|£|\$|€|Rs\.?|INR|GBP|USD|EUR)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)"
+SYMBOL_CURRENCY = {"₹": "INR", "Rs": "INR", "Rs.": "INR", "£": "GBP", "$": "USD", "€": "EUR",
+                   "INR": "INR", "GBP": "GBP", "USD": "USD", "EUR": "EUR"}
+# "4.0 out of 5 stars" -> 4.0, "1,177" -> 1177, "(50% off)" -> 50
+RATING_PATTERN = r"(\d+(?:\.\d+)?)"
+COUNT_PATTERN = r"(\d[\d,]*)"
+OFFER_PATTERN = r"(\d+(?:\.\d+)?)\s*%"
+
+
+
+def extract_number(values: pd.Series, pattern: str) -> pd.Series:
+    number = values.astype("string").str.extract(pattern, expand=False).str.replace(",", "", regex=False)
+    return pd.to_numeric(number, errors="coerce")
+
+
+
+def column_na_mask(values: pd.Series) -> np.ndarray:
+    """
+    True where a cell is 'na' (any case, surrounding whitespace) or missing. The check runs
+    once per distinct value instead of once per cell: the column is factorized and the flags
+    of the uniques are broadcast back through the codes.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    flags = np.fromiter((str(value).strip().lower() == NA_TOKEN for value in uniques),
+                        dtype=bool, count=len(uniques))
+    # missing values get code -1, which picks the trailing True
+    return np.append(flags, True)[codes]
+
+
 
 class DataCleaner:
     """
-    Remove nan values from the data 
+    Remove nan values from the data
     """
 
     def __init__(self):
         self.data_cleaner_config = DataCleaningConfig()
 
 
+    def data_files(self, file_path) -> List[str]:
+        return sorted(glob.glob(os.path.join(file_path, "*.csv")))
+
+
+    @staticmethod
+    def category_of(path: str) -> str:
+        # data_sarees.csv -> sarees, used together with brand and product name as the product's identity
+        return os.path.splitext(os.path.basename(path))[0].replace("data_", "")
+
+
     def load_data(self, file_path):
         try:
             logging.info(f"Loading data from {file_path}")
             dfs = []
-            file_paths = glob.glob(os.path.join(file_path, "*.csv"))
-            for f in file_paths:
-                file = pd.read_csv(f)
+            for f in self.data_files(file_path):
+                # read as text so every file (and every chunk in chunked mode) has the same dtypes
+                file = pd.read_csv(f, dtype=str)
+                file["Category"] = self.category_of(f)
                 dfs.append(file)
 
             df = pd.concat(dfs)
@@ -45,27 +110,43 @@ class DataCleaner:
         except Exception as e:
             logging.info(f"Error in loading data: {str(e)}")
             raise Custom_exception(e, sys)
-    
 
 
-    def check_for_na(self, df: DataFrame):
+
+    def iter_chunks(self, file_path, chunk_size: int) -> Iterator[DataFrame]:
+        for f in self.data_files(file_path):
+            for chunk in pd.read_csv(f, dtype=str, chunksize=chunk_size):
+                chunk["Category"] = self.category_of(f)
+                yield chunk
+
+
+
+    def na_mask(self, df: DataFrame) -> DataFrame:
+        """boolean frame of the 'na'/missing cells, computed once and reused by every step"""
+        return DataFrame({col: column_na_mask(df[col]) for col in df.columns}, index=df.index)
+
+
+
+    def check_for_na(self, df: DataFrame, mask: Optional[DataFrame] = None):
         try:
             logging.info("Checking for 'na' values")
-            df_na = df[df.applymap(lambda x: str(x).strip().lower() == 'na').any(axis=1)]
-            print(f"Total number of records that has 'na': {len(df_na)}")
+            mask = self.na_mask(df) if mask is None else mask
+            print(f"Total number of records that has 'na': {int(mask.any(axis=1).sum())}")
 
-            columns_na = df.applymap(lambda x: str(x).strip().lower() == 'na').sum()
+            columns_na = mask.sum()
             print(f"\ncolumn wise presence of 'na' \n{columns_na}")
+            return columns_na
 
         except Exception as e:
             logging.info(f"Error in checking NA values: {str(e)}")
             raise Custom_exception(e, sys)
-    
 
 
-    def find_mode(self, df: DataFrame):
+
+    def find_mode(self, df: DataFrame, mask: Optional[DataFrame] = None):
         try:
-            df_without_na = df[~df.applymap(lambda x: str(x).strip().lower() == 'na').any(axis=1)]
+            mask = self.na_mask(df) if mask is None else mask
+            df_without_na = df[~mask.any(axis=1).to_numpy()]
 
             cols = df.select_dtypes(include=['object', 'category']).columns
 
@@ -80,47 +161,195 @@ class DataCleaner:
         except Exception as e:
             logging.info(f"Error in calculating replacement values: {str(e)}")
             raise Custom_exception(e, sys)
-    
-    
 
-    def handling_na(self, columns, replacement_value, df: DataFrame, path):
+
+
+    def impute(self, df: DataFrame, columns, replacement_value: Dict, mask: DataFrame) -> DataFrame:
+        """replaces the masked cells of `columns` with their mode, columns without a mode are left missing"""
+        df = df.copy()
+        for col in columns:
+            if col in df.columns:
+                df[col] = df[col].mask(mask[col].to_numpy(), replacement_value.get(col, pd.NA))
+        return df
+
+
+
+    def handling_na(self, columns, replacement_value, df: DataFrame, path, mask: Optional[DataFrame] = None,
+                    catalog_path: Optional[str] = None):
         try:
             logging.info("Replacing 'na' values with mode")
-            
-            # Convert 'na' to pd.NA first
-            df = df.replace('na', pd.NA)
-            
-            for col in columns:
-                if col in df.columns:  # Fixed the condition here
-                    df[col] = df[col].fillna(replacement_value[col])
+            mask = self.na_mask(df) if mask is None else mask
+            df = self.impute(df, columns, replacement_value, mask)
 
             logging.info("Sucessfully replaced 'na' values")
+            typed = self.normalize_values(df)
+
             logging.info("Saving the cleaned data")
+            self.save_outputs(typed, path, catalog_path)
+            return typed
 
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            df.to_csv(path)
-            return df
-        
         except Exception as e:
             logging.info(f"Error in handling NA values: {str(e)}")
             raise Custom_exception(e, sys)
-        
-    
+
+
+
+    def normalize_prices(self, values: pd.Series):
+        """
+        (amounts, currencies) of a price column: parsed, converted to the catalog currency where a
+        rate is known and rounded to 2 decimals. Values already in the catalog currency pass through
+        unchanged, so normalizing the output again is a no-op.
+        """
+        config = self.data_cleaner_config
+        parts = values.astype("string").str.extract(PRICE_PATTERN)
+        amounts = pd.to_numeric(parts["amount"].str.replace(",", "", regex=False), errors="coerce")
+        currencies = parts["symbol"].map(SYMBOL_CURRENCY).fillna(config.currency).astype("object")
+        rates = currencies.map(config.fx_rates)
+        converted = (amounts * rates / config.fx_rates[config.currency]).round(2)
+        return (converted.where(rates.notna(), amounts),
+                currencies.where(rates.isna(), config.currency))
+
+
+
+    def normalize_values(self, df: DataFrame) -> DataFrame:
+        """
+        Parses the scraped text fields into numbers in one vectorized pass per column: prices
+        (with currency conversion), rating, rating count and offer. Returns the typed catalog frame,
+        tagged with the currency of each row's prices.
+        """
+        try:
+            df = df.reset_index(drop=True)
+            normalized = df.copy()
+            for column in PRICE_COLUMNS:
+                if column in df.columns:
+                    normalized[column], currencies = self.normalize_prices(df[column])
+                    if column == "Selling Price":
+                        normalized["Currency"] = currencies
+            for column, pattern in (("Rating", RATING_PATTERN), ("Rating Count", COUNT_PATTERN), ("Offer", OFFER_PATTERN)):
+                if column in df.columns:
+                    normalized[column] = extract_number(df[column], pattern)
+
+            if "Currency" in normalized.columns:
+                unconverted = normalized["Currency"][normalized["Currency"] != self.data_cleaner_config.currency]
+                if len(unconverted):
+                    logging.warning(f"{len(unconverted)} prices kept in their own currency, no FX rate for "
+                                    f"{sorted(unconverted.unique())}")
+            return typed_catalog(normalized)
+
+        except Exception as e:
+            logging.error(f"Error normalizing values: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+
+    def save_outputs(self, typed: DataFrame, path: str, catalog_path: Optional[str] = None) -> None:
+        """csv export for humans, prices shown with their currency symbol, and the typed parquet catalog"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        render_fields(typed).to_csv(path, index=False)
+        if catalog_path:
+            write_catalog(typed, catalog_path)
+            logging.info(f"Saved typed catalog to {catalog_path}")
+
+
+
+    @staticmethod
+    def add_counts(total: Optional[pd.Series], counts: pd.Series) -> pd.Series:
+        """running value counts, an unsorted union keeps merging a chunk linear in its distinct values"""
+        if total is None:
+            return counts
+        index = total.index.union(counts.index, sort=False)
+        return total.reindex(index, fill_value=0) + counts.reindex(index, fill_value=0)
+
+
+
+    def count_modes(self, input_path: str, chunk_size: int, columns) -> Dict:
+        """
+        modes of `columns` over the rows without any 'na', counted chunk by chunk. A column with
+        more than max_mode_values distinct values (names, urls) stops being counted, so memory
+        stays bounded, and gets no mode.
+        """
+        max_values = self.data_cleaner_config.max_mode_values
+        counts = {col: None for col in columns}
+        for chunk in self.iter_chunks(input_path, chunk_size):
+            complete = chunk[~self.na_mask(chunk).any(axis=1).to_numpy()]
+            for col in list(counts):
+                counts[col] = self.add_counts(counts[col], complete[col].value_counts())
+                if len(counts[col]) > max_values:
+                    logging.warning(f"'{col}' has more than {max_values} distinct values, its 'na' cells are not imputed")
+                    del counts[col]
+
+        # same choice as Series.mode(): highest count, smallest value on ties
+        return {col: sorted(value_counts.index[value_counts == value_counts.max()])[0]
+                for col, value_counts in counts.items() if value_counts is not None and not value_counts.empty}
+
+
+
+    def clean_data_chunked(self, chunk_size: int):
+        """
+        Three passes over the csv files, `chunk_size` rows at a time. The first one counts 'na'
+        cells, the second one counts the values of the columns that have any (to get their modes)
+        and the third one imputes and appends every chunk to the output. Only the value counts of
+        those columns stay in memory.
+        """
+        try:
+            logging.info(f"Cleaning data in chunks of {chunk_size} rows")
+            input_path, path = self.data_cleaner_config.input_path, self.data_cleaner_config.output_path
+
+            na_records, columns_na = 0, None
+            for chunk in self.iter_chunks(input_path, chunk_size):
+                mask = self.na_mask(chunk)
+                na_records += int(mask.any(axis=1).sum())
+                columns_na = mask.sum() if columns_na is None else columns_na.add(mask.sum(), fill_value=0)
+
+            print(f"Total number of records that has 'na': {na_records}")
+            print(f"\ncolumn wise presence of 'na' \n{columns_na}")
+
+            # only the columns with 'na' cells get imputed, the others never need a mode
+            columns = [] if columns_na is None else list(columns_na.index[columns_na > 0])
+            modes_dict = self.count_modes(input_path, chunk_size, columns) if columns else {}
+
+            logging.info("Replacing 'na' values with mode")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            catalog = CatalogWriter(self.data_cleaner_config.catalog_path)
+            rows = 0
+            try:
+                for i, chunk in enumerate(self.iter_chunks(input_path, chunk_size)):
+                    chunk = self.impute(chunk, chunk.columns, modes_dict, self.na_mask(chunk))
+                    typed = self.normalize_values(chunk)
+                    render_fields(typed).to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+                    catalog.write(typed)
+                    rows += len(chunk)
+            finally:
+                catalog.close()
+
+            logging.info(f"Saved {rows} cleaned records to {path} and {self.data_cleaner_config.catalog_path}")
+            return path
+
+        except Exception as e:
+            logging.error(f"Error cleaning data in chunks: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
     def clean_data(self):
         try:
             logging.info("Starting data cleaning process")
+            if self.data_cleaner_config.chunk_size > 0:
+                return self.clean_data_chunked(self.data_cleaner_config.chunk_size)
+
             df = self.load_data(self.data_cleaner_config.input_path)
-            self.check_for_na(df)
-            cols, replace_value = self.find_mode(df)
-            df_cleaned = self.handling_na(columns=cols, 
-                                          replacement_value=replace_value, 
-                                          df=df, 
-                                          path=self.data_cleaner_config.output_path)
+            mask = self.na_mask(df)
+            self.check_for_na(df, mask)
+            cols, replace_value = self.find_mode(df, mask)
+            df_cleaned = self.handling_na(columns=cols,
+                                          replacement_value=replace_value,
+                                          df=df,
+                                          path=self.data_cleaner_config.output_path,
+                                          mask=mask,
+                                          catalog_path=self.data_cleaner_config.catalog_path)
 
             logging.info("Data cleaning process has been completed")
             return df_cleaned
-        
+
         except Exception as e:
             logging.error(f"Error cleaning data: {str(e)}")
             raise Custom_exception(e, sys)
-        
\ No newline at end of file
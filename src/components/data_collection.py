@@ -2,6 +2,7 @@ import os
 import sys 
 
 from src.components import scraper 
+from src.components.parallel_scraper import ParallelScraper
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 
@@ -35,7 +36,10 @@ class DataCollectionConfig:
         path = '/opt/airflow/data'
     else:     
         path = 'data'   
-    
+
+    # scrape the keywords' result pages with a pool of headless browsers (SCRAPER_CONCURRENCY),
+    # false scrapes one keyword after another through the search box
+    parallel = os.getenv("SCRAPER_PARALLEL", "true").lower() == "true"
  
 
 class DataCollection:
@@ -50,12 +54,20 @@ class DataCollection:
             successful_products = []
             failed_products = []
 
+            if self.data_collection_config.parallel:
+                collected = ParallelScraper().scrape(products_config)
+
             for product in products_config:
                 try:
                     logging.info(f"Collecting data for: {product['keyword']}, target products: {product['num_products']}") 
 
-                    data = scraper.scrape_products(product['keyword'], 
-                                                   product['num_products'])        
+                    if self.data_collection_config.parallel:
+                        if product['keyword'] not in collected:
+                            raise Exception("No products scraped")
+                        data = collected[product['keyword']]
+                    else:
+                        data = scraper.scrape_products(product['keyword'], 
+                                                       product['num_products'])        
 
                     print("Data shape for", product['keyword'], "is: ", data.shape)
                     print("Sample data for", product['keyword'], "is: ", data.head())
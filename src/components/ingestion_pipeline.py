@@ -0,0 +1,255 @@
+import os
+import sys
+import time
+import queue
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class IngestionPipelineConfig:
+    batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "64"))              # documents per embedding request
+    embed_workers: int = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+    upsert_batch_size: int = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+    upsert_workers: int = int(os.getenv("INGEST_UPSERT_WORKERS", "2"))
+    queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "8"))               # batches buffered between stages
+    max_retries: int = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    batches: int = 0
+    retries: int = 0
+    busy_seconds: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, items: int, seconds: float) -> None:
+        with self.lock:
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = now - seconds
+            self.finished = now
+            self.items += items
+            self.batches += 1
+            self.busy_seconds += seconds
+
+    def summary(self) -> Dict[str, float]:
+        wall = (self.finished - self.started) if self.started is not None else 0.0
+        return {"items": self.items,
+                "batches": self.batches,
+                "retries": self.retries,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "wall_seconds": round(wall, 3),
+                "items_per_second": round(self.items / wall, 2) if wall > 0 else 0.0}
+
+
+
+def is_rate_limited(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "too many requests" in message
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+
+class _Stop:
+    """sentinel put on a queue when the producing stage is done"""
+
+
+
+class IngestionPipeline:
+    """
+    Streams documents through three stages connected by bounded queues:
+    batching -> embedding worker pool -> upsert worker pool.
+    A full queue blocks the stage feeding it, so at most a few batches are held in memory.
+    """
+
+    def __init__(self, embeddings: Embeddings,
+                 upsert_fn: Callable[[List[Document], List[List[float]]], None],
+                 config: Optional[IngestionPipelineConfig] = None):
+        self.embeddings = embeddings
+        self.upsert_fn = upsert_fn
+        self.config = config or IngestionPipelineConfig()
+        self.stats = {name: StageStats(name) for name in ("batching", "embedding", "upsert")}
+        self._stop = threading.Event()
+        self._errors: List[Exception] = []
+
+
+    def _with_retries(self, stage: StageStats, fn: Callable, *args):
+        attempt = 0
+        while True:
+            try:
+                return fn(*args)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.config.max_retries or self._stop.is_set():
+                    raise
+                # exponential backoff with full jitter, the server's Retry-After wins when it is given
+                delay = random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+                if is_rate_limited(e):
+                    delay = retry_after_seconds(e) or max(delay, self.config.backoff_base)
+                with stage.lock:
+                    stage.retries += 1
+                logging.info(f"{stage.name} attempt {attempt} failed ({str(e)[:200]}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """blocking put that gives up once the pipeline is stopping, so a failed stage can't deadlock the others"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+    def _fail(self, error: Exception) -> None:
+        self._errors.append(error)
+        self._stop.set()
+
+
+    def _embed_worker(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        stage = self.stats["embedding"]
+        while not self._stop.is_set():
+            try:
+                batch = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if batch is _Stop:
+                return
+            try:
+                start = time.perf_counter()
+                vectors = self._with_retries(stage, self.embeddings.embed_documents,
+                                             [doc.page_content for doc in batch])
+                stage.record(len(batch), time.perf_counter() - start)
+                self._put(outbox, (batch, vectors))
+            except Exception as e:
+                logging.error(f"Embedding batch failed: {str(e)}")
+                self._fail(e)
+                return
+
+
+    def _upsert_worker(self, inbox: queue.Queue) -> None:
+        stage = self.stats["upsert"]
+        size = self.config.upsert_batch_size
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _Stop:
+                return
+            batch, vectors = item
+            try:
+                for start in range(0, len(batch), size):
+                    t0 = time.perf_counter()
+                    self._with_retries(stage, self.upsert_fn, batch[start:start + size], vectors[start:start + size])
+                    stage.record(len(batch[start:start + size]), time.perf_counter() - t0)
+            except Exception as e:
+                logging.error(f"Upsert batch failed: {str(e)}")
+                self._fail(e)
+                return
+
+
+    def run(self, documents: Iterable[Document]) -> Dict[str, Dict[str, float]]:
+        try:
+            cfg = self.config
+            logging.info(f"Starting ingestion pipeline: {cfg}")
+            embed_queue = queue.Queue(maxsize=cfg.queue_size)
+            upsert_queue = queue.Queue(maxsize=cfg.queue_size)
+
+            embedders = [threading.Thread(target=self._embed_worker, args=(embed_queue, upsert_queue),
+                                          name=f"embed-{i}", daemon=True) for i in range(cfg.embed_workers)]
+            upserters = [threading.Thread(target=self._upsert_worker, args=(upsert_queue,),
+                                          name=f"upsert-{i}", daemon=True) for i in range(cfg.upsert_workers)]
+            for worker in embedders + upserters:
+                worker.start()
+
+            # batching stage runs on the calling thread and pulls documents lazily
+            batching = self.stats["batching"]
+            batch: List[Document] = []
+            t0 = time.perf_counter()
+            for doc in documents:
+                if self._stop.is_set():
+                    break
+                batch.append(doc)
+                if len(batch) == cfg.batch_size:
+                    batching.record(len(batch), time.perf_counter() - t0)
+                    self._put(embed_queue, batch)
+                    batch = []
+                    t0 = time.perf_counter()
+            if batch:
+                batching.record(len(batch), time.perf_counter() - t0)
+                self._put(embed_queue, batch)
+
+            for _ in embedders:
+                self._put(embed_queue, _Stop)
+            for worker in embedders:
+                worker.join()
+            for _ in upserters:
+                self._put(upsert_queue, _Stop)
+            for worker in upserters:
+                worker.join()
+
+            if self._errors:
+                raise self._errors[0]
+
+            summary = {name: stage.summary() for name, stage in self.stats.items()}
+            logging.info(f"Ingestion pipeline finished: {summary}")
+            print(f"[INFO] Ingestion pipeline stats: {summary}")
+            return summary
+
+        except Exception as e:
+            self._stop.set()
+            logging.error(f"Error in ingestion pipeline: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+
+def pinecone_upsert_fn(index, text_key: str = "text", namespace: Optional[str] = None) -> Callable:
+    """upsert callable writing vectors in the layout PineconeVectorStore reads back (text under `text_key`)"""
+    def upsert(docs: Sequence[Document], vectors: Sequence[Sequence[float]]) -> None:
+        index.upsert(vectors=[{"id": doc.id,
+                               "values": vector,
+                               "metadata": {**doc.metadata, text_key: doc.page_content}}
+                              for doc, vector in zip(docs, vectors)],
+                     namespace=namespace)
+    return upsert
+
+
+def local_upsert_fn(vector_store) -> Callable:
+    """upsert callable for LocalVectorStore, writes are serialized since the store isn't thread safe"""
+    lock = threading.Lock()
+
+    def upsert(docs: Sequence[Document], vectors: Sequence[Sequence[float]]) -> None:
+        with lock:
+            vector_store.add_embeddings([doc.page_content for doc in docs], vectors,
+                                        metadatas=[doc.metadata for doc in docs],
+                                        ids=[doc.id for doc in docs])
+    return upsert
@@ -0,0 +1,240 @@
+import os
+import sys
+import math
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from src.components import scraper
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class ParallelScraperConfig:
+    # headless browsers scraping at the same time, each one is a chrome process
+    concurrency: int = int(os.getenv("SCRAPER_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+    base_url: str = os.getenv("SCRAPER_BASE_URL", "https://www.amazon.in")    # or a server with fixture pages
+    page_timeout: float = float(os.getenv("SCRAPER_PAGE_TIMEOUT", "10"))      # explicit wait for the results
+    page_retries: int = int(os.getenv("SCRAPER_PAGE_RETRIES", "2"))
+    products_per_page: int = int(os.getenv("SCRAPER_PRODUCTS_PER_PAGE", "48"))  # guess until pages come back
+    max_pages: int = int(os.getenv("SCRAPER_MAX_PAGES", "400"))
+    extraction_mode: str = scraper.EXTRACTION_MODE                           # SCRAPER_EXTRACTION_MODE
+
+    def __post_init__(self):
+        if self.concurrency < 1:
+            raise ValueError("SCRAPER_CONCURRENCY must be at least 1")
+        if self.extraction_mode not in scraper.EXTRACTION_MODES:
+            raise ValueError(f"Unknown SCRAPER_EXTRACTION_MODE '{self.extraction_mode}', "
+                             f"expected one of {scraper.EXTRACTION_MODES}")
+
+
+
+PageTask = Tuple[str, int]                  # (keyword, page)
+
+
+
+@dataclass
+class CategoryPages:
+    """pages of one keyword: handed out, finished and failed, and the rows collected so far"""
+    keyword: str
+    target: int
+    next_page: int = 1
+    last_page: Optional[int] = None         # known once a page comes back empty
+    in_flight: Set[int] = field(default_factory=set)
+    rows: Dict[int, List[dict]] = field(default_factory=dict)
+    attempts: Dict[int, int] = field(default_factory=dict)
+    failed: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def collected(self) -> int:
+        return sum(len(rows) for rows in self.rows.values())
+
+
+    def products(self) -> List[dict]:
+        """rows in page order up to the target, pages past the end of the results are dropped"""
+        pages = sorted(page for page in self.rows if self.last_page is None or page <= self.last_page)
+        return [row for page in pages for row in self.rows[page]][:self.target]
+
+
+
+class PageQueue:
+    """
+    Work queue of (keyword, page) tasks shared by the scraper workers.
+
+    Pages are handed out round robin across keywords, and only as many as the keyword still
+    needs: rows collected plus the pages in flight times the average page size must stay
+    under its target. A page without products ends its keyword, failed pages are retried
+    before new ones are handed out. get() blocks while the pages in flight may still call
+    for more, and returns None once every keyword is done.
+    """
+
+    def __init__(self, products: List[dict], config: ParallelScraperConfig):
+        self.config = config
+        self.categories = {product["keyword"]: CategoryPages(product["keyword"], product["num_products"])
+                           for product in products}
+        self.retries: Deque[PageTask] = deque()
+        self.pages_done = 0
+        self.rows_done = 0
+        self._order = deque(self.categories)
+        self._condition = threading.Condition()
+
+
+    def _page_size(self) -> float:
+        # average over the non empty pages of every keyword, the configured guess before any came back
+        pages = [len(rows) for category in self.categories.values() for rows in category.rows.values() if rows]
+        return sum(pages) / len(pages) if pages else self.config.products_per_page
+
+
+    def _needs_page(self, category: CategoryPages, page_size: float) -> bool:
+        if category.next_page > self.config.max_pages:
+            return False
+        if category.last_page is not None and category.next_page > category.last_page:
+            return False
+        return category.collected + len(category.in_flight) * page_size < category.target
+
+
+    def _next_task(self) -> Optional[PageTask]:
+        while self.retries:
+            keyword, page = self.retries.popleft()
+            category = self.categories[keyword]
+            if category.last_page is None or page <= category.last_page:
+                category.in_flight.add(page)
+                return keyword, page
+
+        page_size = self._page_size()
+        for _ in range(len(self._order)):
+            keyword = self._order[0]
+            self._order.rotate(-1)
+            category = self.categories[keyword]
+            if self._needs_page(category, page_size):
+                page = category.next_page
+                category.next_page += 1
+                category.in_flight.add(page)
+                return keyword, page
+        return None
+
+
+    def _finished(self) -> bool:
+        return not self.retries and all(not category.in_flight for category in self.categories.values())
+
+
+    def get(self) -> Optional[PageTask]:
+        with self._condition:
+            while True:
+                task = self._next_task()
+                if task is not None or self._finished():
+                    return task
+                self._condition.wait()
+
+
+    def complete(self, task: PageTask, rows: List[dict]) -> None:
+        keyword, page = task
+        with self._condition:
+            category = self.categories[keyword]
+            category.in_flight.discard(page)
+            category.rows[page] = rows
+            if not rows:
+                category.last_page = page - 1 if category.last_page is None else min(category.last_page, page - 1)
+            self.pages_done += 1
+            self.rows_done += len(rows)
+            self._condition.notify_all()
+
+
+    def fail(self, task: PageTask, error: Exception) -> None:
+        keyword, page = task
+        with self._condition:
+            category = self.categories[keyword]
+            category.in_flight.discard(page)
+            category.attempts[page] = category.attempts.get(page, 0) + 1
+            if category.attempts[page] <= self.config.page_retries:
+                self.retries.append(task)
+            else:
+                category.failed[page] = str(error)
+            self._condition.notify_all()
+
+
+
+class ParallelScraper:
+    """
+    Scrapes several keywords at once with a pool of headless browsers.
+
+    Every worker thread owns one driver and takes (keyword, page) tasks from a shared
+    PageQueue, loading results pages directly by url and waiting on the product cards
+    instead of sleeping. The browsers do the heavy lifting in their own processes, so a
+    thread per driver is enough to keep them all busy. A driver that fails a page is
+    replaced before the worker's next task.
+    """
+
+    def __init__(self, config: Optional[ParallelScraperConfig] = None,
+                 scrape_page: Optional[Callable] = None):
+        self.config = config or ParallelScraperConfig()
+        self.scrape_page = scrape_page or scraper.scrape_page
+
+
+    def _worker(self, pages: PageQueue, worker_id: int) -> None:
+        driver, user_data_dir = None, None
+        try:
+            while True:
+                task = pages.get()
+                if task is None:
+                    return
+                keyword, page = task
+                try:
+                    if driver is None:
+                        driver, user_data_dir = scraper.create_driver(headless=True, implicit_wait=0)
+                    start = time.perf_counter()
+                    rows = self.scrape_page(driver, self.config.base_url, keyword, page,
+                                            self.config.page_timeout, self.config.extraction_mode)
+                    logging.info(f"Worker {worker_id} scraped page {page} of {keyword}: "
+                                 f"{len(rows)} products in {time.perf_counter() - start:.2f}s")
+                    pages.complete(task, rows)
+                except Exception as e:
+                    logging.error(f"Worker {worker_id} failed on page {page} of {keyword}: {str(e)}")
+                    pages.fail(task, e)
+                    scraper.close_driver(driver, user_data_dir)
+                    driver, user_data_dir = None, None
+        finally:
+            scraper.close_driver(driver, user_data_dir)
+
+
+    def scrape(self, products: List[dict]) -> Dict[str, pd.DataFrame]:
+        """
+        `products` entries as in products_config (keyword, num_products). Returns the rows of
+        each keyword in page order, keywords that got no products at all are left out.
+        """
+        try:
+            pages = PageQueue(products, self.config)
+            workers = min(self.config.concurrency,
+                          sum(math.ceil(product["num_products"] / self.config.products_per_page) for product in products))
+            logging.info(f"Scraping {len(products)} keywords with {workers} browsers from {self.config.base_url}")
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=self._worker, args=(pages, i), name=f"scraper-{i}", daemon=True)
+                       for i in range(max(workers, 1))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            logging.info(f"Scraped {pages.rows_done} products from {pages.pages_done} pages in {elapsed:.1f}s "
+                         f"({pages.pages_done / elapsed if elapsed else 0:.2f} pages/s)")
+
+            results = {}
+            for keyword, category in pages.categories.items():
+                if category.failed:
+                    logging.error(f"Pages {sorted(category.failed)} of {keyword} failed after retries")
+                data = category.products()
+                if len(data) < category.target:
+                    logging.info(f"Collected {len(data)} of {category.target} products for {keyword}")
+                if data:
+                    results[keyword] = pd.DataFrame(data, columns=list(scraper.FIELD_XPATHS))
+            return results
+
+        except Exception as e:
+            logging.error(f"Error in parallel scraping: {str(e)}")
+            raise Custom_exception(e, sys)
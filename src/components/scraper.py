@@ -4,7 +4,11 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
+from urllib.parse import quote_plus
+from lxml import etree, html
+from typing import Dict, List, Optional, Tuple
 import sys
 import time
 import pandas as pd
@@ -15,44 +19,243 @@ import shutil
 from src.utils.exception import Custom_exception
 from src.utils.logger import logging
 
-def scrape_products(keyword:str, num_products:int) -> pd.DataFrame:
-        
-        driver = None
-        unique_user_data_dir = None
 
+# for "Sarees for women" and for "Watches for men"
+PRODUCT_XPATH = "//div[@class='a-section a-spacing-base']"
+# for "Mens formal shirts"
+#PRODUCT_XPATH = "//div[@class='a-section a-spacing-base a-text-center']"
+
+CAPTCHA_XPATH = "//div[@class = 'a-row a-text-center']//img"      # <div class=a-row a-text-center>
+
+# the search results list, present without product cards past the last page of results
+RESULTS_XPATH = "//div[contains(@class, 's-main-slot')]"
+
+# column -> (xpath inside a product card, attribute to read or None for the visible text)
+# .text doesn't work for the rating and selling price because of unknown factors like css, therefore we use 'textContent'
+FIELD_XPATHS = {
+    "Brand Name": (".//h2[@class='a-size-mini s-line-clamp-1']//span", None),
+    "Product Name": (".//h2[@class='a-size-base-plus a-spacing-none a-color-base a-text-normal']//span", None),
+    "Rating": (".//i[@data-cy='reviews-ratings-slot']//span", "textContent"),
+    "Rating Count": (".//span[@class='a-size-base s-underline-text']", None),
+    "Selling Price": (".//span[@class='a-price']//span[@class='a-offscreen']", "textContent"),
+    "MRP": (".//span[@class='a-price a-text-price']//span[@aria-hidden='true']", None),
+    "Offer": (".//div[@class='a-row']//span[contains(text(), '%')]", None),
+}
+
+# "html" parses the page source once per results page, "elements" reads every field through the driver
+EXTRACTION_MODES = ("html", "elements")
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "html").lower()
+
+# compiled once, used by parse_products_html on every page
+PRODUCT_PATH = etree.XPath(PRODUCT_XPATH)
+FIELD_PATHS = {column: (etree.XPath(xpath), attribute) for column, (xpath, attribute) in FIELD_XPATHS.items()}
+
+
+
+def create_driver(headless: bool = False, implicit_wait: float = 10) -> Tuple[webdriver.Chrome, Optional[str]]:
+    """
+    chrome driver for the current environment and the temporary profile directory it uses (or None).
+    Drivers running side by side need headless=True, each one gets its own profile directory.
+    """
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == 'true'
+    logging.info(f"Running in {'Airflow' if is_airflow else 'local'} environment")
+
+    if is_airflow:
+        path = "/usr/bin/chromedriver"
+    else:
+        path = "F:/Data Science/Projects/4.Ecommerce-Chatbot-Project/chromedriver.exe"
+    path = os.getenv("CHROMEDRIVER_PATH", path)
+
+    # Initializing chrome_options
+    chrome_options = Options()
+    unique_user_data_dir = None
+
+    if is_airflow or headless:
+        unique_user_data_dir = f"/tmp/chrome_user_data_{uuid.uuid4()}"         # Create unique temporary directory for this Chrome instance
+        os.makedirs(unique_user_data_dir, exist_ok=True)
+        chrome_options.add_argument(f"--user-data-dir={unique_user_data_dir}")
+        chrome_options.add_argument('--headless=new')                          # scrape without a new Chrome window every time.
+
+    # configuration for airflow environment
+    if is_airflow:
+        chrome_options.binary_location = "/usr/bin/chromium"                   # chromium path in the container
+
+    # configuration for both local and airflow environments
+    chrome_options.add_argument("--window-size=1920,1080")  # opening the new chrome window with maximum size
+
+    try:
+        # initializing the driver
+        driver = webdriver.Chrome(service=Service(path), options=chrome_options)
+    except Exception:
+        remove_user_data_dir(unique_user_data_dir)
+        raise
+
+    # timeouts after driver initialization
+    driver.set_page_load_timeout(30)        # 30 seconds for page load
+    driver.implicitly_wait(implicit_wait)   # seconds for element finding, 0 when only explicit waits are used
+
+    logging.info("Chrome driver initialized successfully")
+    return driver, unique_user_data_dir
+
+
+
+def remove_user_data_dir(unique_user_data_dir: Optional[str]) -> None:
+    if unique_user_data_dir and os.path.exists(unique_user_data_dir):
         try:
-            is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == 'true'
-            logging.info(f"Running in {'Airflow' if is_airflow else 'local'} environment")
+            shutil.rmtree(unique_user_data_dir, ignore_errors=True)
+            logging.info("Temporary directory cleaned up")
+        except Exception as cleanup_error:
+            logging.info(f"Error cleaning temp directory: {cleanup_error}")
+
+
+
+def close_driver(driver: Optional[webdriver.Chrome], unique_user_data_dir: Optional[str]) -> None:
+    # quit driver
+    if driver is not None:
+        try:
+            driver.quit()
+            logging.info("Chrome driver closed successfully")
+        except Exception as cleanup_error:
+            logging.error(f"Error closing driver: {cleanup_error}")
+
+    # Clean up temporary directory
+    remove_user_data_dir(unique_user_data_dir)
+
+
+
+def solve_captcha(driver: webdriver.Chrome) -> bool:
+    """solves amazon's captcha page if it is shown, True when there was one"""
+    captcha_images = driver.find_elements(By.XPATH, CAPTCHA_XPATH)
+    if not captcha_images:
+        logging.info("No captcha found")
+        return False
+
+    # captcha handling
+    link = captcha_images[0].get_attribute("src")
+    captcha = AmazonCaptcha.fromlink(link)
+    captcha_value = AmazonCaptcha.solve(captcha)
+
+    logging.info("Captcha found and bypassing...")
+
+    input_field = driver.find_element(By.ID, "captchacharacters")
+    input_field.send_keys(captcha_value)
+
+    continue_shopping = driver.find_element(By.CLASS_NAME, "a-button-text")
+    continue_shopping.click()
+    logging.info("Captcha bypassed successfully")
+    return True
+
+
 
-            if is_airflow:
-                path = "/usr/bin/chromedriver"
+def extract_card(product) -> Dict[str, str]:
+    """one row from a product card element, 'na' for the fields it doesn't have"""
+    row = {}
+    for column, (xpath, attribute) in FIELD_XPATHS.items():
+        try:
+            element = product.find_element(By.XPATH, xpath)
+            row[column] = element.get_attribute(attribute) if attribute else element.text
+        except Exception:
+            row[column] = "na"
+    return row
+
+
+
+def parse_products_html(page_source: str) -> List[Dict[str, str]]:
+    """
+    Rows of every product card in a results page, parsed from its html in a single pass.
+    Gives the same values as extract_card: textContent as it is, visible text with the
+    whitespace collapsed the way the driver's .text does.
+    """
+    document = html.fromstring(page_source)
+    rows = []
+    for product in PRODUCT_PATH(document):
+        row = {}
+        for column, (path, attribute) in FIELD_PATHS.items():
+            found = path(product)
+            if not found:
+                row[column] = "na"
+            elif attribute == "textContent":
+                row[column] = found[0].text_content()
+            elif attribute:
+                row[column] = found[0].get(attribute, "na")
             else:
-                path = "F:/Data Science/Projects/4.Ecommerce-Chatbot-Project/chromedriver.exe"
+                row[column] = " ".join(found[0].text_content().split())
+        rows.append(row)
+    return rows
 
-            # Initializing chrome_options
-            chrome_options = Options()
-            
-            # configuration for airflow environment
-            if is_airflow:
-                unique_user_data_dir = f"/tmp/chrome_user_data_{uuid.uuid4()}"         # Create unique temporary directory for this Chrome instance 
-                os.makedirs(unique_user_data_dir, exist_ok=True)
 
-                chrome_options.add_argument(f"--user-data-dir={unique_user_data_dir}")
-                chrome_options.binary_location = "/usr/bin/chromium"                   # chromium path in the container
-                chrome_options.add_argument('--headless=new')                          # scrape without a new Chrome window every time.
 
+def extract_products(driver: webdriver.Chrome, extraction_mode: str = EXTRACTION_MODE) -> List[Dict[str, str]]:
+    """rows of the product cards on the current page"""
+    if extraction_mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{extraction_mode}', expected one of {EXTRACTION_MODES}")
+    if extraction_mode == "html":
+        return parse_products_html(driver.page_source)
+    return [extract_card(product) for product in driver.find_elements(By.XPATH, PRODUCT_XPATH)]
 
-            # configuration for both local and airflow environments 
-            chrome_options.add_argument("--window-size=1920,1080")  # opening the new chrome window with maximum size
 
-            # initializing the driver 
-            driver = webdriver.Chrome(service=Service(path), options=chrome_options)
-            
-            # timeouts after driver initialization
-            driver.set_page_load_timeout(30)  # 30 seconds for page load
-            driver.implicitly_wait(10)        # 10 seconds for element finding
-            
-            logging.info("Chrome driver initialized successfully")
+
+def search_url(base_url: str, keyword: str, page: int) -> str:
+    """url of one results page, base_url is amazon or a server with saved fixture pages"""
+    return f"{base_url.rstrip('/')}/s?k={quote_plus(keyword)}&page={page}"
+
+
+
+def wait_for_results(driver: webdriver.Chrome, timeout: float) -> str:
+    """
+    Waits until the page shows product cards ("products"), a captcha ("captcha") or a fully
+    loaded results list without cards ("empty", past the last page of results). Raises
+    TimeoutException when none of them shows up in time, so a slow or throttled page is
+    retried instead of being taken for the end of the results.
+    """
+    def page_state(d):
+        if d.find_elements(By.XPATH, PRODUCT_XPATH):
+            return "products"
+        if d.find_elements(By.XPATH, CAPTCHA_XPATH):
+            return "captcha"
+        if (d.execute_script("return document.readyState") == "complete"
+                and d.find_elements(By.XPATH, RESULTS_XPATH)):
+            return "empty"
+        return False
+
+    return WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+        page_state, message=f"No results page at {driver.current_url} after {timeout}s")
+
+
+
+def scrape_page(driver: webdriver.Chrome, base_url: str, keyword: str, page: int,
+                timeout: float = 10, extraction_mode: str = EXTRACTION_MODE) -> List[Dict[str, str]]:
+    """
+    Rows of one search results page, loaded directly by url so pages can be spread across
+    drivers. An empty list means the page loaded without results, there are no more for
+    the keyword. Pages that don't load in time or stay behind a captcha raise.
+    """
+    url = search_url(base_url, keyword, page)
+    driver.get(url)
+    state = wait_for_results(driver, timeout)
+
+    if state == "captcha" and solve_captcha(driver):
+        driver.get(url)
+        state = wait_for_results(driver, timeout)
+    if state == "captcha":
+        raise Exception(f"Captcha still shown on {url}")
+    if state == "empty":
+        logging.info(f"No products on {url}")
+        return []
+
+    products = extract_products(driver, extraction_mode)
+    logging.info(f"Number of products found on page {page} for {keyword}: {len(products)}")
+    return products
+
+
+
+def scrape_products(keyword:str, num_products:int, extraction_mode:str = EXTRACTION_MODE) -> pd.DataFrame:
+        
+        driver = None
+        unique_user_data_dir = None
+
+        try:
+            driver, unique_user_data_dir = create_driver()
             
             url = "https://www.amazon.in/"
 
@@ -69,24 +272,7 @@ def scrape_products(keyword:str, num_products:int) -> pd.DataFrame:
 
             time.sleep(2)
 
-            try:
-                # captcha handling
-                link = driver.find_element(By.XPATH, "//div[@class = 'a-row a-text-center']//img").get_attribute("src")    # <div class=a-row a-text-center>
-                
-                captcha = AmazonCaptcha.fromlink(link)
-                captcha_value = AmazonCaptcha.solve(captcha)
-
-                logging.info("Captcha found and bypassing...")
-
-                input_field = driver.find_element(By.ID, "captchacharacters")
-                input_field.send_keys(captcha_value)
-
-                continue_shopping = driver.find_element(By.CLASS_NAME, "a-button-text")
-                continue_shopping.click()
-                logging.info("Captcha bypassed successfully")
-
-            except NoSuchElementException:
-                logging.info("No captcha found")
+            solve_captcha(driver)
 
             time.sleep(3)
 
@@ -107,11 +293,7 @@ def scrape_products(keyword:str, num_products:int) -> pd.DataFrame:
 
                 logging.info(f"Scraping page {current_page}")
 
-                # for "Mens formal shirts"
-                #products = driver.find_elements(By.XPATH, "//div[@class='a-section a-spacing-base a-text-center']")
-                
-                # for "Sarees for women" and for "Watches for men"
-                products = driver.find_elements(By.XPATH, "//div[@class='a-section a-spacing-base']")
+                products = extract_products(driver, extraction_mode)
                 logging.info(f"Number of products found on page {current_page}: {len(products)}")
 
                 # iterating through each products 
@@ -123,58 +305,7 @@ def scrape_products(keyword:str, num_products:int) -> pd.DataFrame:
                     total_scraped = len(data)+1
                     logging.info(f"Scraping product {total_scraped} on page {current_page}")
 
-                    try:
-                        brand_name = product.find_element(By.XPATH,".//h2[@class='a-size-mini s-line-clamp-1']//span").text
-                    except:
-                        brand_name = "na"
-                    
-                    try:   
-                        product_name = product.find_element(By.XPATH, ".//h2[@class='a-size-base-plus a-spacing-none a-color-base a-text-normal']//span").text
-                    except:
-                        product_name = "na"
-                        
-                    try:
-                        # .text doesn't work because of unknown factors like css, therefore we use 'textContent'
-                        rating_element = product.find_element(By.XPATH, ".//i[@data-cy='reviews-ratings-slot']//span")
-                        rating = rating_element.get_attribute('textContent')
-                    except:
-                        rating = "na"
-
-                    try: 
-                        rating_count = product.find_element(By.XPATH, ".//span[@class='a-size-base s-underline-text']").text
-                    except:
-                        rating_count = "na"
-
-                    try: 
-                        selling_price_element = product.find_element(By.XPATH, ".//span[@class='a-price']//span[@class='a-offscreen']")
-                        selling_price = selling_price_element.get_attribute('textContent')
-                    except:
-                        selling_price = "na"
-                    
-                    try: 
-                        mrp = product.find_element(By.XPATH, ".//span[@class='a-price a-text-price']//span[@aria-hidden='true']").text
-                    except:
-                        mrp = "na"
-
-                    try: 
-                        offer = product.find_element(By.XPATH, ".//div[@class='a-row']//span[contains(text(), '%')]").text
-                    except:
-                        offer = "na"
-                    
-                    # try:
-                    #     delivery_price = driver.find_element(By.XPATH, "/html/body/div[1]/div[1]/div[1]/div[1]/div/span[1]/div[1]/div[3]/div/div/div/div/span/div/div/div[2]/div[5]/div/div[2]/span/span[1]")
-                    # except:
-                    #     delivery_price = "na"
-
-
-                    data.append({"Brand Name": brand_name,
-                                "Product Name": product_name,
-                                "Rating": rating,
-                                "Rating Count": rating_count,
-                                "Selling Price": selling_price,
-                                "MRP": mrp,
-                                "Offer": offer})
-                                #"Delivery Price: ", delivery_price})
+                    data.append(product)
                 
                     # Break out of the loop if the desired number of products is reached
                     if len(data) == num_products:
@@ -203,18 +334,4 @@ def scrape_products(keyword:str, num_products:int) -> pd.DataFrame:
             raise Custom_exception(e, sys)
 
         finally:
-            # quit driver 
-            if driver is not None:
-                try:
-                    driver.quit()
-                    logging.info("Chrome driver closed successfully")
-                except Exception as cleanup_error:
-                    logging.error(f"Error closing driver: {cleanup_error}")
-            
-            # Clean up temporary directory
-            if unique_user_data_dir and os.path.exists(unique_user_data_dir):
-                try:
-                    shutil.rmtree(unique_user_data_dir, ignore_errors=True)
-                    logging.info("Temporary directory cleaned up")
-                except Exception as cleanup_error:
-                    logging.info(f"Error cleaning temp directory: {cleanup_error}")
\ No newline at end of file
+            close_driver(driver, unique_user_data_dir)
@@ -1,8 +1,8 @@
 import os 
 import sys 
 import time
-from typing import List
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Set
+from dataclasses import dataclass, field
 
 from langchain_community.document_loaders.csv_loader import CSVLoader
 from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
@@ -10,6 +10,13 @@ from pinecone import Pinecone, ServerlessSpec
 from langchain_pinecone import PineconeVectorStore
 from langchain.schema import Document
 
+from src.utils.local_vectorstore import LocalVectorStore
+from src.utils.embedding_cache import EmbeddingCache, CachedEmbeddings
+from src.components.ingestion_pipeline import IngestionPipeline, pinecone_upsert_fn, local_upsert_fn
+from src.utils.semantic_cache import touch_index_version
+from src.utils.product_utils import prepare_product_document
+from src.utils.catalog import iter_catalog_documents, resolve_catalog_path
+from src.utils.local_providers import LocalProviderConfig, local_embeddings
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 from dotenv import load_dotenv
@@ -22,10 +29,27 @@ class VectorStoreBuilderConfig:
     is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
 
     if is_airflow:
-        path = "/opt/airflow/artifacts/data_cleaned.csv"
+        path = "/opt/airflow/artifacts/data_cleaned.parquet"
+        local_index_path = "/opt/airflow/artifacts/vector_index"
+        embedding_cache_path = "/opt/airflow/artifacts/embedding_cache.sqlite"
+        index_version_path = "/opt/airflow/artifacts/index_version.txt"
 
     else:
-        path = "artifacts/data_cleaned.csv"
+        path = "artifacts/data_cleaned.parquet"                     # falls back to the csv export
+        local_index_path = os.getenv("LOCAL_INDEX_PATH", "artifacts/vector_index")
+        embedding_cache_path = "artifacts/embedding_cache.sqlite"
+        index_version_path = os.getenv("INDEX_VERSION_PATH", "artifacts/index_version.txt")
+
+    # "pinecone" (default) or "local" for the in-process numpy index
+    backend = os.getenv("VECTORSTORE_BACKEND", "pinecone").lower()
+
+@dataclass
+class SyncProgress:
+    """ids a sync streamed through, complete only once the document stream ran out without errors"""
+    seen_ids: Set[str] = field(default_factory=set)
+    complete: bool = False
+
+
 
 class VectorStoreBuilder:
     """
@@ -36,11 +60,17 @@ class VectorStoreBuilder:
 
     def __init__(self):
         self.vectorstore_builder_config = VectorStoreBuilderConfig()
+        self.provider_config = LocalProviderConfig()
         self.nvidia_api_key = os.getenv("NVIDIA_API_KEY")
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
         print(f"[DEBUG] NVIDIA_API_KEY: {self.nvidia_api_key}")
         print(f"[DEBUG] PINECONE_API_KEY: {self.pinecone_api_key}")
-        if not self.nvidia_api_key or not self.pinecone_api_key:
+        if self.provider_config.is_local and self.vectorstore_builder_config.backend != "local":
+            # the pinecone index is sized for the 4096-d nvidia embeddings
+            raise ValueError("MODEL_PROVIDER=local requires VECTORSTORE_BACKEND=local")
+        if not self.nvidia_api_key and not self.provider_config.is_local:
+            raise ValueError("Required API keys not set")
+        if self.vectorstore_builder_config.backend == "pinecone" and not self.pinecone_api_key:
             raise ValueError("Required API keys not set")
 
 
@@ -52,40 +82,68 @@ class VectorStoreBuilder:
         Load and combine documents from multiple CSV files. Truncate text to 512 characters for embedding.
         Enhanced logging: checks file existence, logs document counts per file, and errors.
         """
-        all_docs = []
+        all_docs = list(self.iter_documents(data_paths))
+        print(f"[INFO] Total combined documents: {len(all_docs)}")
+        logging.info(f"Total combined documents: {len(all_docs)}")
+        return all_docs
+
+
+
+    def iter_documents(self, data_paths: list) -> Iterator[Document]:
+        """
+        Lazily yields prepared documents row by row, so the ingestion pipeline never needs
+        the whole corpus in memory. The same product scraped twice maps to the same id,
+        only its first occurrence is kept. A missing or unreadable file raises: a sync that
+        went on with part of the catalog would delete the rest from the index.
+        """
+        seen_ids = set()
         for data_path in data_paths:
             try:
                 if not os.path.exists(data_path):
-                    logging.error(f"File not found: {data_path}")
-                    print(f"[ERROR] File not found: {data_path}")
-                    continue
+                    raise FileNotFoundError(f"File not found: {data_path}")
                 logging.info(f"Loading data from {data_path}")
                 print(f"[INFO] Loading data from {data_path}")
-                loader = CSVLoader(file_path=data_path,
-                                   encoding="utf-8",
-                                    csv_args={"delimiter": ",",
-                                              "quotechar": '"'})
-                docs = loader.load()
-                # Truncate document text to 512 characters
-                for doc in docs:
-                    if hasattr(doc, 'page_content'):
-                        doc.page_content = doc.page_content[:512]
-                logging.info(f"Sample data from {data_path}: {docs[:2]}")
-                print(f"[INFO] Loaded {len(docs)} documents from {data_path}")
-                logging.info(f"Loaded {len(docs)} documents from {data_path}.")
-                all_docs.extend(docs)
+                if data_path.endswith(".parquet"):
+                    # typed artifact from the cleaning stage, rendered to the same documents as the csv
+                    raw_documents = iter_catalog_documents(data_path)
+                else:
+                    raw_documents = CSVLoader(file_path=data_path,
+                                              encoding="utf-8",
+                                              csv_args={"delimiter": ",",
+                                                        "quotechar": '"'}).lazy_load()
+                loaded, duplicates = 0, 0
+                for doc in raw_documents:
+                    doc = self.prepare_document(doc)
+                    if doc.id in seen_ids:
+                        duplicates += 1
+                        continue
+                    seen_ids.add(doc.id)
+                    loaded += 1
+                    yield doc
+                print(f"[INFO] Loaded {loaded} documents from {data_path} ({duplicates} duplicates dropped)")
+                logging.info(f"Loaded {loaded} documents from {data_path} ({duplicates} duplicates dropped).")
             except Exception as e:
                 logging.error(f"Error in loading data from {data_path}: {str(e)}")
                 print(f"[ERROR] Error in loading data from {data_path}: {str(e)}")
-                continue
-        print(f"[INFO] Total combined documents: {len(all_docs)}")
-        logging.info(f"Total combined documents: {len(all_docs)}")
-        return all_docs
-    
+                raise Custom_exception(e, sys)
+
+
+
+    def prepare_document(self, doc: Document) -> Document:
+        """
+        Gives a loaded row its stable product id, numeric price/rating metadata and content hash.
+        Drops the unnamed index column and truncates text to 512 characters for embedding.
+        """
+        return prepare_product_document(doc)
+
 
 
     def create_embeddings(self) -> NVIDIAEmbeddings:
         try:
+            if self.provider_config.is_local:
+                logging.info("Initializing local hashing embeddings (MODEL_PROVIDER=local)")
+                return local_embeddings(self.provider_config)
+
             logging.info("Initializing NVIDIA Embeddings.")
             embeddings = NVIDIAEmbeddings(
                 model="nvidia/nv-embedqa-mistral-7b-v2",
@@ -102,7 +160,97 @@ class VectorStoreBuilder:
 
 
 
-    def create_vector_store(self, documents: List[Document], 
+    def create_cached_embeddings(self, embeddings: NVIDIAEmbeddings) -> CachedEmbeddings:
+        """wraps the embeddings with the on-disk cache so rebuilds only embed new or changed rows"""
+        try:
+            logging.info(f"Opening embedding cache at {self.vectorstore_builder_config.embedding_cache_path}")
+            cache = EmbeddingCache(self.vectorstore_builder_config.embedding_cache_path)
+            logging.info(f"Embedding cache contains {len(cache)} vectors")
+            return CachedEmbeddings(embeddings, cache)
+
+        except Exception as e:
+            logging.error(f"Error initializing embedding cache: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+
+
+    def wait_for_index_ready(self, pc: Pinecone, index_name: str,
+                             timeout: float = 300, interval: float = 2) -> None:
+        """polls the index status instead of sleeping a fixed amount of time"""
+        deadline = time.monotonic() + timeout
+        while True:
+            status = pc.describe_index(index_name).status
+            if status["ready"]:
+                logging.info(f"Index '{index_name}' is ready")
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Index '{index_name}' not ready after {timeout} seconds (status: {status})")
+            time.sleep(interval)
+
+
+
+    def fetch_indexed_hashes(self, index, batch_size: int = 100) -> Dict[str, str]:
+        """returns {id: content_hash} for every vector currently in the Pinecone index"""
+        existing_ids = []
+        for ids in index.list():
+            existing_ids.extend(ids)
+
+        hashes = {}
+        for start in range(0, len(existing_ids), batch_size):
+            fetched = index.fetch(ids=existing_ids[start:start + batch_size])
+            for vector_id, vector in fetched.vectors.items():
+                hashes[vector_id] = (vector.metadata or {}).get("content_hash", "")
+        return hashes
+
+
+
+    def changed_documents(self, documents: Iterable[Document],
+                          indexed_hashes: Dict[str, str],
+                          progress: SyncProgress) -> Iterator[Document]:
+        """
+        Streams the documents that need (re)embedding. Every id passed through is added to
+        `progress.seen_ids`, and `progress.complete` is set once the source is exhausted, so
+        stale ids are only worked out from a catalog that was read to the end.
+        """
+        for doc in documents:
+            progress.seen_ids.add(doc.id)
+            if indexed_hashes.get(doc.id) != doc.metadata["content_hash"]:
+                yield doc
+        progress.complete = True
+
+
+
+    def stale_ids(self, indexed_hashes: Dict[str, str], progress: SyncProgress) -> List[str]:
+        """
+        indexed ids that are no longer in the catalog. None when the document stream stopped
+        early or no documents were loaded at all, a partial read must not delete the rest.
+        """
+        if not progress.complete:
+            logging.error("Document stream did not complete, skipping the deletion of stale vectors")
+            print("[ERROR] Document stream did not complete, skipping the deletion of stale vectors")
+            return []
+        if not progress.seen_ids:
+            logging.error("No documents loaded, skipping the deletion of stale vectors")
+            print("[ERROR] No documents loaded, skipping the deletion of stale vectors")
+            return []
+        return [vector_id for vector_id in indexed_hashes if vector_id not in progress.seen_ids]
+
+
+
+    def log_sync_summary(self, seen_ids: Set[str], stale_ids: List[str], stats: Dict) -> None:
+        upserted = stats["upsert"]["items"] if stats else 0
+        if upserted or stale_ids:
+            # tells the serving side (semantic cache) that cached answers may be outdated
+            touch_index_version(self.vectorstore_builder_config.index_version_path)
+        logging.info(f"Sync summary: {upserted} upserted, {len(stale_ids)} deleted, "
+                     f"{len(seen_ids) - upserted} unchanged")
+        print(f"[INFO] Sync summary: {upserted} upserted, {len(stale_ids)} deleted, "
+              f"{len(seen_ids) - upserted} unchanged")
+
+
+
+    def create_vector_store(self, documents: Iterable[Document], 
                             embeddings: NVIDIAEmbeddings, 
                             index_name: str = 'ecommerce-chatbot-project') -> PineconeVectorStore:
         try:
@@ -119,30 +267,36 @@ class VectorStoreBuilder:
                                     metric="cosine",
                                     spec=ServerlessSpec(cloud="aws", region="us-east-1"))
                     print(f"[DEBUG] Index creation requested.")
-                    time.sleep(10)
                 except Exception as e:
                     print(f"[DEBUG] Exception during index creation: {e}")
                     raise
             else:
                 print(f"[DEBUG] Index '{index_name}' already exists. Skipping creation.")
 
+            self.wait_for_index_ready(pc, index_name)
             index = pc.Index(index_name)
-            time.sleep(10)
-
-            # Proceed directly to uploading new data (no manual delete step)
 
             initial_stats = index.describe_index_stats()
             print(f"[DEBUG] Index status before uploading: {initial_stats}")
             logging.info(f"Index status before uploading: {initial_stats}")
 
-            vector_store = PineconeVectorStore.from_documents(documents=documents,
-                                                              index_name=index_name, 
-                                                              embedding = embeddings)
+            # only upsert new/changed products and remove the ones that disappeared from the catalog
+            indexed_hashes = self.fetch_indexed_hashes(index)
+            progress = SyncProgress()
+            pipeline = IngestionPipeline(embeddings, pinecone_upsert_fn(index))
+            stats = pipeline.run(self.changed_documents(documents, indexed_hashes, progress))
+
+            stale_ids = self.stale_ids(indexed_hashes, progress)
+            for start in range(0, len(stale_ids), 1000):
+                index.delete(ids=stale_ids[start:start + 1000])
+            self.log_sync_summary(progress.seen_ids, stale_ids, stats)
+
+            vector_store = PineconeVectorStore(index=index, embedding=embeddings)
 
             final_stats = index.describe_index_stats()
             logging.info(f"Index status after uploading: {final_stats}")
 
-            logging.info(f"Successfully created vector store with {len(documents)} documents")
+            logging.info(f"Successfully synced vector store with {len(progress.seen_ids)} documents")
             return vector_store
         except Exception as e:
             logging.error(f"Error creating vector store: {str(e)}")
@@ -151,16 +305,54 @@ class VectorStoreBuilder:
 
 
 
-    def run_pipeline(self) -> PineconeVectorStore:
+    def create_local_vector_store(self, documents: Iterable[Document],
+                                  embeddings: NVIDIAEmbeddings) -> LocalVectorStore:
+        try:
+            path = self.vectorstore_builder_config.local_index_path
+            logging.info(f"Syncing local vector store at {path}")
+
+            if LocalVectorStore.exists(path):
+                vector_store = LocalVectorStore.load(path, embedding=embeddings, mmap=False)
+            else:
+                vector_store = LocalVectorStore(embedding=embeddings)
+
+            indexed_hashes = {doc.id: doc.metadata.get("content_hash", "")
+                              for doc in vector_store.get_by_ids(vector_store.ids)}
+            progress = SyncProgress()
+            pipeline = IngestionPipeline(embeddings, local_upsert_fn(vector_store))
+            stats = pipeline.run(self.changed_documents(documents, indexed_hashes, progress))
+
+            stale_ids = self.stale_ids(indexed_hashes, progress)
+            if stale_ids:
+                vector_store.delete(stale_ids)
+            vector_store.save(path)
+            self.log_sync_summary(progress.seen_ids, stale_ids, stats)
+
+            logging.info(f"Successfully synced local vector store with {len(progress.seen_ids)} documents")
+            return vector_store
+        except Exception as e:
+            logging.error(f"Error creating local vector store: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+
+
+    def run_pipeline(self):
         try:
             logging.info("Starting vectorstore pipeline (product data only)")
             # Only use product data
             data_paths = [
-                self.vectorstore_builder_config.path
+                resolve_catalog_path(self.vectorstore_builder_config.path) or self.vectorstore_builder_config.path
             ]
-            docs = self.load_data(data_paths)
-            embeddings = self.create_embeddings()
-            vector_store = self.create_vector_store(docs, embeddings)
+            docs = self.iter_documents(data_paths)
+            embeddings = self.create_cached_embeddings(self.create_embeddings())
+            if self.vectorstore_builder_config.backend == "local":
+                vector_store = self.create_local_vector_store(docs, embeddings)
+            else:
+                vector_store = self.create_vector_store(docs, embeddings)
+
+            logging.info(f"Embedding cache stats: {embeddings.stats()}")
+            print(f"[INFO] Embedding cache stats: {embeddings.stats()}")
 
             logging.info("Vectorstore pipeline completed successfully (product data only)")
             return vector_store
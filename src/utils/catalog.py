@@ -0,0 +1,151 @@
+import os
+import sys
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain_core.documents import Document
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+# typed schema of the cleaned catalog artifact, in the column order of the scraped csv files.
+# prices are in the row's Currency, Offer is the discount in percent
+CATALOG_SCHEMA = pa.schema([("Brand Name", pa.dictionary(pa.int32(), pa.string())),
+                            ("Product Name", pa.string()),
+                            ("Rating", pa.float32()),
+                            ("Rating Count", pa.int64()),
+                            ("Selling Price", pa.float64()),
+                            ("MRP", pa.float64()),
+                            ("Offer", pa.float32()),
+                            ("Category", pa.dictionary(pa.int32(), pa.string())),
+                            ("Currency", pa.dictionary(pa.int32(), pa.string()))])
+
+CATALOG_COLUMNS = CATALOG_SCHEMA.names
+NUMERIC_COLUMNS = ["Rating", "Rating Count", "Selling Price", "MRP", "Offer"]
+CATEGORICAL_COLUMNS = ["Brand Name", "Category", "Currency"]
+PRICE_COLUMNS = ["Selling Price", "MRP"]
+# what documents and the csv export show, the currency is shown as the price symbol instead
+DOCUMENT_COLUMNS = [column for column in CATALOG_COLUMNS if column != "Currency"]
+
+CURRENCY_SYMBOLS = {"GBP": "£", "INR": "₹", "USD": "$", "EUR": "€"}
+
+
+
+def typed_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """casts a normalized frame (numeric prices and ratings) to the catalog dtypes, in schema order"""
+    typed = pd.DataFrame(index=pd.RangeIndex(len(df)))
+    for field in CATALOG_SCHEMA:
+        values = df[field.name].reset_index(drop=True) if field.name in df.columns else pd.Series(pd.NA, index=typed.index)
+        if field.name in NUMERIC_COLUMNS:
+            values = pd.to_numeric(values, errors="coerce")
+            typed[field.name] = values.astype("Int64") if pa.types.is_integer(field.type) else values.astype(field.type.to_pandas_dtype())
+        elif field.name in CATEGORICAL_COLUMNS:
+            typed[field.name] = values.astype("string").astype("category")
+        else:
+            typed[field.name] = values.astype("string")
+    return typed
+
+
+
+# nullable pandas dtypes on read, so missing rating counts stay integers
+PANDAS_TYPES = {pa.int64(): pd.Int64Dtype(), pa.string(): pd.StringDtype()}
+
+
+
+def catalog_table(typed: pd.DataFrame) -> pa.Table:
+    # no pandas metadata, every file (single write or chunked) reads back through PANDAS_TYPES
+    return pa.Table.from_pandas(typed, schema=CATALOG_SCHEMA, preserve_index=False).replace_schema_metadata(None)
+
+
+
+def write_catalog(typed: pd.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pq.write_table(catalog_table(typed), path, compression="zstd")
+
+
+
+class CatalogWriter:
+    """appends typed chunks to one parquet file, used by the chunked cleaning mode"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.writer = pq.ParquetWriter(path, CATALOG_SCHEMA, compression="zstd")
+
+
+    def write(self, typed: pd.DataFrame) -> None:
+        self.writer.write_table(catalog_table(typed))
+
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+
+def read_catalog(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """reads only `columns`, memory-mapped; brand and category come back as categoricals"""
+    return pq.read_table(path, columns=columns, memory_map=True).to_pandas(types_mapper=PANDAS_TYPES.get)
+
+
+
+def resolve_catalog_path(path: str) -> Optional[str]:
+    """`path` if it exists, else its .parquet/.csv sibling, so either artifact can be configured"""
+    if os.path.exists(path):
+        return path
+    root, ext = os.path.splitext(path)
+    sibling = root + (".csv" if ext == ".parquet" else ".parquet")
+    return sibling if os.path.exists(sibling) else None
+
+
+
+def render_fields(batch: pd.DataFrame) -> pd.DataFrame:
+    """
+    typed columns back to the scraped text formats, so documents read the same as the csv ones.
+    Prices get the symbol of the row's Currency, which is not rendered as a column itself.
+    """
+    text = pd.DataFrame(index=batch.index)
+    symbols = (batch["Currency"].astype("object").map(lambda code: CURRENCY_SYMBOLS.get(code, f"{code} "))
+               if "Currency" in batch.columns else pd.Series(CURRENCY_SYMBOLS["GBP"], index=batch.index))
+    for column in batch.columns:
+        values = batch[column]
+        if column == "Currency":
+            continue
+        if column in PRICE_COLUMNS:
+            rendered = symbols + values.map(lambda v: f"{v:,.2f}", na_action="ignore").fillna("")
+        elif column == "Rating":
+            rendered = values.map(lambda v: f"{v:.1f} out of 5 stars", na_action="ignore")
+        elif column == "Rating Count":
+            rendered = values.map(lambda v: f"{int(v):,}", na_action="ignore")
+        elif column == "Offer":
+            rendered = values.map(lambda v: f"({v:.0f}% off)", na_action="ignore")
+        else:
+            rendered = values.astype("object")
+        text[column] = rendered.astype("object").where(values.notna(), "na")
+    return text
+
+
+
+def iter_catalog_documents(path: str, columns: Optional[List[str]] = None,
+                           batch_size: int = 10000) -> Iterator[Document]:
+    """
+    Streams the parquet catalog as CSVLoader-style documents ("Column: value" lines), reading
+    only `columns` a batch at a time from a memory-mapped file.
+    """
+    try:
+        columns = list(columns or DOCUMENT_COLUMNS)
+        if any(column in PRICE_COLUMNS for column in columns) and "Currency" not in columns:
+            columns.append("Currency")                  # needed for the price symbol
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        row = 0
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            text = render_fields(record_batch.to_pandas(types_mapper=PANDAS_TYPES.get))
+            names = list(text.columns)
+            for values in text.itertuples(index=False, name=None):
+                yield Document(page_content="\n".join(f"{name}: {value}" for name, value in zip(names, values)),
+                               metadata={"source": path, "row": row})
+                row += 1
+    except Exception as e:
+        logging.error(f"Error reading catalog {path}: {str(e)}")
+        raise Custom_exception(e, sys)
@@ -0,0 +1,432 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from src.utils.session_store import SessionStore
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class HistoryBackendConfig:
+    # "memory" (per process, default), "sqlite" (shared by processes on one node) or "redis" (shared across nodes)
+    backend = os.getenv("CHAT_HISTORY_BACKEND", "memory").lower()
+    sqlite_path = os.getenv("CHAT_HISTORY_SQLITE_PATH", "artifacts/chat_history.sqlite")
+    redis_url = os.getenv("CHAT_HISTORY_REDIS_URL", "redis://localhost:6379/1")
+    key_prefix = "chat_history:"
+    max_messages = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+    idle_ttl_seconds = int(float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800")))
+    # how often a worker deletes the sqlite sessions idle longer than idle_ttl_seconds
+    prune_interval_seconds = float(os.getenv("CHAT_HISTORY_PRUNE_INTERVAL_SECONDS", "300"))
+    # how long a worker may serve a session's history from its own memory before re-reading it
+    cache_ttl_seconds = float(os.getenv("CHAT_HISTORY_CACHE_TTL_SECONDS", "2"))
+    cache_max_sessions = int(os.getenv("CHAT_HISTORY_CACHE_MAX_SESSIONS", "10000"))
+
+
+
+def _dumps(message: BaseMessage) -> str:
+    return json.dumps(message_to_dict(message))
+
+
+def _loads(raw) -> BaseMessage:
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    return messages_from_dict([json.loads(raw)])[0]
+
+
+def _trim(messages: List[BaseMessage], max_messages: int) -> List[BaseMessage]:
+    return messages[-max_messages:] if max_messages and len(messages) > max_messages else messages
+
+
+
+class HistoryCache:
+    """
+    Read-through cache of recent histories in this process. Writes go through it too,
+    so a turn handled here never needs to re-read its own messages.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> Optional[List[BaseMessage]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return list(entry[0])
+
+    def put(self, session_id: str, messages: List[BaseMessage]) -> None:
+        with self._lock:
+            self._entries[session_id] = (list(messages), time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def append(self, session_id: str, messages: Sequence[BaseMessage], max_messages: int) -> None:
+        """extends a cached history after a write, keeping the entry's original freshness"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries[session_id] = (_trim(entry[0] + list(messages), max_messages), entry[1])
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    History stored in a sqlite file, shared by every worker process on the node.
+    A turn's messages are appended, trimmed and the session's last access updated in a
+    single transaction. Sessions idle longer than `ttl_seconds` read as empty and are
+    deleted by the next prune, at most every `prune_interval` seconds per process.
+    """
+
+    _connections: Dict[str, sqlite3.Connection] = {}
+    _connections_lock = threading.Lock()
+    _last_prune: Dict[str, float] = {}
+
+    def __init__(self, session_id: str, path: str, cache: HistoryCache,
+                 max_messages: int = 20, ttl_seconds: Optional[int] = None,
+                 prune_interval: float = 300):
+        self.session_id = session_id
+        self.path = path
+        self.cache = cache
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._conn = self._connection(path)
+
+
+    @classmethod
+    def _connection(cls, path: str) -> sqlite3.Connection:
+        with cls._connections_lock:
+            conn = cls._connections.get(path)
+            if conn is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""CREATE TABLE IF NOT EXISTS messages (
+                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    session_id TEXT NOT NULL,
+                                    message TEXT NOT NULL)""")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+                conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                                    session_id TEXT PRIMARY KEY,
+                                    last_access REAL NOT NULL)""")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+                # files written before sessions were tracked, their sessions start aging now
+                conn.execute("""INSERT OR IGNORE INTO sessions (session_id, last_access)
+                                SELECT DISTINCT session_id, ? FROM messages""", (time.time(),))
+                cls._connections[path] = conn
+                cls._last_prune[path] = time.monotonic()
+            return conn
+
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds if self.ttl_seconds else float("-inf")
+
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        cached = self.cache.get(self.session_id)
+        if cached is not None:
+            return cached
+        with self._connections_lock:
+            rows = self._conn.execute("""SELECT message FROM messages WHERE session_id = ? AND EXISTS
+                                         (SELECT 1 FROM sessions WHERE session_id = ? AND last_access >= ?)
+                                         ORDER BY id""",
+                                      (self.session_id, self.session_id, self._cutoff())).fetchall()
+        messages = [_loads(row[0]) for row in rows]
+        self.cache.put(self.session_id, messages)
+        return messages
+
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._connections_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # a session that expired but wasn't pruned yet starts over, like an expired redis key
+                self._conn.execute("""DELETE FROM messages WHERE session_id = ? AND EXISTS
+                                      (SELECT 1 FROM sessions WHERE session_id = ? AND last_access < ?)""",
+                                   (self.session_id, self.session_id, self._cutoff()))
+                self._conn.executemany("INSERT INTO messages (session_id, message) VALUES (?, ?)",
+                                       [(self.session_id, _dumps(message)) for message in messages])
+                self._conn.execute("""DELETE FROM messages WHERE session_id = ? AND id NOT IN
+                                      (SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)""",
+                                   (self.session_id, self.session_id, self.max_messages))
+                self._conn.execute("INSERT OR REPLACE INTO sessions (session_id, last_access) VALUES (?, ?)",
+                                   (self.session_id, time.time()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._maybe_prune()
+        self.cache.append(self.session_id, messages, self.max_messages)
+
+
+    def _maybe_prune(self) -> None:
+        """deletes the sessions idle longer than the ttl, called with the connections lock held"""
+        now = time.monotonic()
+        if not self.ttl_seconds or now - self._last_prune.get(self.path, 0.0) < self.prune_interval:
+            return
+        self._last_prune[self.path] = now
+        cutoff = self._cutoff()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = self._conn.execute("""DELETE FROM messages WHERE session_id IN
+                                            (SELECT session_id FROM sessions WHERE last_access < ?)""",
+                                         (cutoff,)).rowcount
+            sessions = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,)).rowcount
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if sessions:
+            logging.info(f"Pruned {sessions} idle chat sessions ({deleted} messages) from {self.path}")
+
+
+    def clear(self) -> None:
+        with self._connections_lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (self.session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (self.session_id,))
+        self.cache.invalidate(self.session_id)
+
+
+    @classmethod
+    def metrics(cls, path: str, ttl_seconds: Optional[int] = None) -> Dict[str, int]:
+        conn = cls._connection(path)
+        cutoff = time.time() - ttl_seconds if ttl_seconds else float("-inf")
+        with cls._connections_lock:
+            live = conn.execute("SELECT COUNT(*) FROM sessions WHERE last_access >= ?", (cutoff,)).fetchone()[0]
+            stored = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {"live_sessions": live, "stored_sessions": stored, "messages": messages}
+
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the part of the redis-py API the redis backend uses: lists with
+    expiry and pipelines. CHAT_HISTORY_REDIS_URL=memory:// selects it, to run and test the
+    redis backend without a server. Histories are only shared within the process.
+    """
+
+    def __init__(self, purge_interval: float = 60):
+        self._lists: Dict[str, List[str]] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._purge_interval = purge_interval
+        self._last_purge = time.monotonic()
+
+
+    @staticmethod
+    def _range(items: List[str], start: int, end: int) -> slice:
+        # redis ranges are inclusive and count negative indexes from the end
+        count = len(items)
+        start = max(count + start, 0) if start < 0 else start
+        end = count + end if end < 0 else end
+        return slice(start, max(end + 1, start))
+
+
+    def _live(self, key: str) -> Optional[List[str]]:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._lists.pop(key, None)
+            self._expires.pop(key, None)
+        return self._lists.get(key)
+
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < self._purge_interval:
+            return
+        self._last_purge = now
+        for key in [key for key, expires in self._expires.items() if expires <= now]:
+            self._lists.pop(key, None)
+            self._expires.pop(key, None)
+
+
+    def rpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            self._purge_expired()
+            items = self._live(key)
+            if items is None:
+                items = self._lists[key] = []
+            items.extend(values)
+            return len(items)
+
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._live(key)
+            if items is not None:
+                items[:] = items[self._range(items, start, end)]
+                if not items:
+                    self.delete(key)
+            return True
+
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._live(key) or []
+            return items[self._range(items, start, end)]
+
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            deleted = sum(self._lists.pop(key, None) is not None for key in keys)
+            for key in keys:
+                self._expires.pop(key, None)
+            return deleted
+
+
+    def pipeline(self) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(self._live(key) is not None for key in list(self._lists))
+
+
+
+class LocalPipeline:
+    """queues commands and runs them together under the stand-in's lock, like a MULTI/EXEC pipeline"""
+
+    def __init__(self, client: LocalRedis):
+        self.client = client
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self.client, name)
+
+        def queue(*args):
+            self._commands.append((method, args))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        with self.client._lock:
+            results = [method(*args) for method, args in self._commands]
+        self._commands = []
+        return results
+
+
+
+class RedisChatMessageHistory(BaseChatMessageHistory):
+    """
+    History stored in a Redis list, shared by every worker on every node.
+    `client` is anything speaking the redis-py API (redis.Redis, or LocalRedis / fakeredis
+    as a local stand-in). Appending a turn is one pipelined round-trip: RPUSH + LTRIM + EXPIRE.
+    """
+
+    def __init__(self, session_id: str, client: Any, cache: HistoryCache,
+                 key_prefix: str = "chat_history:", max_messages: int = 20,
+                 ttl_seconds: Optional[int] = None):
+        self.session_id = session_id
+        self.client = client
+        self.cache = cache
+        self.key = f"{key_prefix}{session_id}"
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        cached = self.cache.get(self.session_id)
+        if cached is not None:
+            return cached
+        messages = [_loads(raw) for raw in self.client.lrange(self.key, 0, -1)]
+        self.cache.put(self.session_id, messages)
+        return messages
+
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        if not messages:
+            return
+        pipe = self.client.pipeline()
+        pipe.rpush(self.key, *[_dumps(message) for message in messages])
+        if self.max_messages:
+            pipe.ltrim(self.key, -self.max_messages, -1)
+        if self.ttl_seconds:
+            pipe.expire(self.key, self.ttl_seconds)
+        pipe.execute()
+        self.cache.append(self.session_id, messages, self.max_messages)
+
+
+    def clear(self) -> None:
+        self.client.delete(self.key)
+        self.cache.invalidate(self.session_id)
+
+
+
+def build_history_factory(config: HistoryBackendConfig,
+                          session_store: SessionStore,
+                          redis_client: Any = None) -> Callable[[str], BaseChatMessageHistory]:
+    """returns the get_session_history callable for RunnableWithMessageHistory"""
+    try:
+        logging.info(f"Using '{config.backend}' chat history backend")
+        if config.backend == "memory":
+            return session_store.get
+
+        cache = HistoryCache(config.cache_ttl_seconds, config.cache_max_sessions)
+
+        if config.backend == "sqlite":
+            return lambda session_id: SQLiteChatMessageHistory(session_id, config.sqlite_path, cache,
+                                                               max_messages=config.max_messages,
+                                                               ttl_seconds=config.idle_ttl_seconds,
+                                                               prune_interval=config.prune_interval_seconds)
+
+        if config.backend == "redis":
+            if redis_client is None and config.redis_url.startswith("memory://"):
+                redis_client = LocalRedis()
+            elif redis_client is None:
+                import redis                    # optional dependency, only needed for this backend
+                redis_client = redis.Redis.from_url(config.redis_url)
+            return lambda session_id: RedisChatMessageHistory(session_id, redis_client, cache,
+                                                              key_prefix=config.key_prefix,
+                                                              max_messages=config.max_messages,
+                                                              ttl_seconds=config.idle_ttl_seconds)
+
+        raise ValueError(f"Unknown chat history backend: {config.backend}")
+    except Exception as e:
+        logging.error(f"Error creating chat history backend: {str(e)}")
+        raise Custom_exception(e, sys)
+
+
+
+def history_metrics(config: HistoryBackendConfig, session_store: SessionStore) -> Dict[str, Any]:
+    """session metrics of the backend in use, for /stats"""
+    if config.backend == "memory":
+        return {"backend": "memory", **session_store.metrics()}
+    if config.backend == "sqlite":
+        return {"backend": "sqlite", **SQLiteChatMessageHistory.metrics(config.sqlite_path, config.idle_ttl_seconds)}
+    # counting sessions would mean scanning the keyspace, redis expires idle ones itself
+    return {"backend": config.backend, "idle_ttl_seconds": config.idle_ttl_seconds}
@@ -0,0 +1,243 @@
+import json
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.utils.semantic_cache import SemanticCache
+from src.utils.http_clients import HttpClientConfig, deadline_scope
+from src.utils.metrics import CHAT_TURNS, StageTimingCallbackHandler
+from src.utils.single_flight import AsyncFlight, AsyncSingleFlight, Flight, SingleFlight, flight_key
+from src.utils.logger import logging
+
+
+SESSION_COOKIE = "chat_session_id"
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """formats one Server-Sent Event, payload is json so newlines in tokens survive"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+
+class ChatService:
+    """
+    Single entry point for answering a chat turn, shared by the flask app (app.py)
+    and the async app (async_app.py). Wraps the RunnableWithMessageHistory built by
+    BuildChatbot with sync and async invoke/stream methods.
+
+    First-turn questions (empty session history) don't depend on any conversation state,
+    so they are answered from the semantic cache when a similar question was seen before.
+    When `chain` (the retrieval chain without history) is given, identical first-turn
+    questions that are in flight at the same time share one chain execution.
+    """
+
+    def __init__(self, chatbot: Any,
+                 get_session_history: Optional[Callable[[str], BaseChatMessageHistory]] = None,
+                 semantic_cache: Optional[SemanticCache] = None,
+                 chain: Any = None,
+                 deadline_seconds: Optional[float] = None):
+        self.chatbot = chatbot
+        self.get_session_history = get_session_history
+        self.semantic_cache = semantic_cache
+        self.chain = chain
+        self.deadline_seconds = deadline_seconds or HttpClientConfig().request_deadline
+        self.flights = SingleFlight() if chain is not None else None
+        self.async_flights = AsyncSingleFlight() if chain is not None else None
+
+
+    @staticmethod
+    def session_config(session_id: str) -> dict:
+        # a fresh handler per turn times each stage for /metrics
+        return {"configurable": {"session_id": session_id},
+                "callbacks": [StageTimingCallbackHandler()]}
+
+
+    def _is_first_turn(self, session_id: str) -> bool:
+        return self.get_session_history is not None and not self.get_session_history(session_id).messages
+
+
+    def _record_turn(self, session_id: str, question: str, answer: str) -> None:
+        """adds a turn answered outside the chain to the session, as RunnableWithMessageHistory would"""
+        self.get_session_history(session_id).add_messages([HumanMessage(content=question),
+                                                           AIMessage(content=answer)])
+
+
+    async def _arecord_turn(self, session_id: str, question: str, answer: str) -> None:
+        await self.get_session_history(session_id).aadd_messages([HumanMessage(content=question),
+                                                                  AIMessage(content=answer)])
+
+
+    def _coalesced(self, question: str, session_id: str, vector: Any) -> Iterator[str]:
+        """runs a first-turn question through a shared flight and records the turn in this session"""
+        def produce(flight: Flight) -> None:
+            for chunk in self.chain.stream({"input": question, "chat_history": []},
+                                          config={"callbacks": [StageTimingCallbackHandler()]}):
+                token = chunk.get("answer")
+                if token:
+                    flight.publish(token)
+
+        flight, leader = self.flights.join(flight_key(question), produce)
+        CHAT_TURNS.inc(source="chain" if leader else "coalesced")
+        if not leader:
+            logging.info(f"Joined in-flight request for the same question ({flight.waiters} waiters)")
+        yield from flight.iter_tokens()
+        answer = flight.answer()
+        self._record_turn(session_id, question, answer)
+        if leader:
+            logging.info(f"Chatbot Response: {answer}")
+            if vector is not None:
+                self.semantic_cache.store(question, answer, vector)
+
+
+    async def _acoalesced(self, question: str, session_id: str, vector: Any) -> AsyncIterator[str]:
+        async def produce(flight: AsyncFlight) -> None:
+            async for chunk in self.chain.astream({"input": question, "chat_history": []},
+                                                 config={"callbacks": [StageTimingCallbackHandler()]}):
+                token = chunk.get("answer")
+                if token:
+                    await flight.publish(token)
+
+        flight, leader = self.async_flights.join(flight_key(question), produce)
+        CHAT_TURNS.inc(source="chain" if leader else "coalesced")
+        if not leader:
+            logging.info(f"Joined in-flight request for the same question ({flight.waiters} waiters)")
+        async for token in flight.iter_tokens():
+            yield token
+        answer = flight.answer()
+        await self._arecord_turn(session_id, question, answer)
+        if leader:
+            logging.info(f"Chatbot Response: {answer}")
+            if vector is not None:
+                self.semantic_cache.store(question, answer, vector)
+
+
+    def _invoke(self, question: str, session_id: str) -> str:
+        first_turn = self._is_first_turn(session_id)
+        cacheable = first_turn and self.semantic_cache is not None
+        vector = None
+        if cacheable:
+            cached, vector = self.semantic_cache.lookup(question)
+            if cached is not None:
+                logging.info("Semantic cache hit")
+                CHAT_TURNS.inc(source="semantic_cache")
+                self._record_turn(session_id, question, cached)
+                return cached
+
+        if first_turn and self.flights is not None:
+            return "".join(self._coalesced(question, session_id, vector))
+
+        CHAT_TURNS.inc(source="chain")
+        response = self.chatbot.invoke({"input": question}, config=self.session_config(session_id))
+        logging.info(f"Chatbot Response: {response['answer']}")
+        if cacheable:
+            self.semantic_cache.store(question, response["answer"], vector)
+        return response["answer"]
+
+
+    def _stream(self, question: str, session_id: str) -> Iterator[str]:
+        """yields answer tokens, the session history is saved once the stream is exhausted"""
+        first_turn = self._is_first_turn(session_id)
+        cacheable = first_turn and self.semantic_cache is not None
+        vector = None
+        if cacheable:
+            cached, vector = self.semantic_cache.lookup(question)
+            if cached is not None:
+                logging.info("Semantic cache hit")
+                CHAT_TURNS.inc(source="semantic_cache")
+                self._record_turn(session_id, question, cached)
+                yield cached
+                return
+
+        if first_turn and self.flights is not None:
+            yield from self._coalesced(question, session_id, vector)
+            return
+
+        answer = []
+        CHAT_TURNS.inc(source="chain")
+        for chunk in self.chatbot.stream({"input": question}, config=self.session_config(session_id)):
+            token = chunk.get("answer")
+            if token:
+                answer.append(token)
+                yield token
+        logging.info(f"Chatbot Response: {''.join(answer)}")
+        if cacheable:
+            self.semantic_cache.store(question, "".join(answer), vector)
+
+
+    async def _ainvoke(self, question: str, session_id: str) -> str:
+        first_turn = self._is_first_turn(session_id)
+        cacheable = first_turn and self.semantic_cache is not None
+        vector = None
+        if cacheable:
+            cached, vector = await self.semantic_cache.alookup(question)
+            if cached is not None:
+                logging.info("Semantic cache hit")
+                CHAT_TURNS.inc(source="semantic_cache")
+                await self._arecord_turn(session_id, question, cached)
+                return cached
+
+        if first_turn and self.async_flights is not None:
+            return "".join([token async for token in self._acoalesced(question, session_id, vector)])
+
+        CHAT_TURNS.inc(source="chain")
+        response = await self.chatbot.ainvoke({"input": question}, config=self.session_config(session_id))
+        logging.info(f"Chatbot Response: {response['answer']}")
+        if cacheable:
+            self.semantic_cache.store(question, response["answer"], vector)
+        return response["answer"]
+
+
+    async def _astream(self, question: str, session_id: str) -> AsyncIterator[str]:
+        first_turn = self._is_first_turn(session_id)
+        cacheable = first_turn and self.semantic_cache is not None
+        vector = None
+        if cacheable:
+            cached, vector = await self.semantic_cache.alookup(question)
+            if cached is not None:
+                logging.info("Semantic cache hit")
+                CHAT_TURNS.inc(source="semantic_cache")
+                await self._arecord_turn(session_id, question, cached)
+                yield cached
+                return
+
+        if first_turn and self.async_flights is not None:
+            async for token in self._acoalesced(question, session_id, vector):
+                yield token
+            return
+
+        answer = []
+        CHAT_TURNS.inc(source="chain")
+        async for chunk in self.chatbot.astream({"input": question}, config=self.session_config(session_id)):
+            token = chunk.get("answer")
+            if token:
+                answer.append(token)
+                yield token
+        logging.info(f"Chatbot Response: {''.join(answer)}")
+        if cacheable:
+            self.semantic_cache.store(question, "".join(answer), vector)
+
+
+
+    # public entry points, every provider call made for the turn shares one deadline
+
+    def invoke(self, question: str, session_id: str) -> str:
+        with deadline_scope(self.deadline_seconds):
+            return self._invoke(question, session_id)
+
+
+    def stream(self, question: str, session_id: str) -> Iterator[str]:
+        with deadline_scope(self.deadline_seconds):
+            yield from self._stream(question, session_id)
+
+
+    async def ainvoke(self, question: str, session_id: str) -> str:
+        with deadline_scope(self.deadline_seconds):
+            return await self._ainvoke(question, session_id)
+
+
+    async def astream(self, question: str, session_id: str) -> AsyncIterator[str]:
+        with deadline_scope(self.deadline_seconds):
+            async for token in self._astream(question, session_id):
+                yield token
@@ -1,17 +1,25 @@
 import os 
 import sys
-from typing import Any
+from typing import Any, Optional
 
-from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_pinecone import PineconeVectorStore
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
-from langchain_core.chat_history import BaseChatMessageHistory, InMemoryChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
+from src.utils.local_vectorstore import LocalVectorStore
+from src.utils.session_store import SessionStore
+from src.utils.chat_history_backends import HistoryBackendConfig, build_history_factory
+from src.utils.query_constraints import ConstrainedRetriever
+from src.utils.hybrid_retriever import HybridRetriever, InvertedIndex
+from src.utils.context_builder import ContextBuilder, estimate_tokens
+from src.utils.embedding_batcher import EmbeddingBatcher, EmbeddingBatcherConfig
+from src.utils.embedding_cache import EmbeddingCache, QueryEmbeddingCache, QueryEmbeddingCacheConfig
+from src.utils.startup import StartupTimer
+from src.utils.http_clients import get_http_clients
+from src.utils.local_providers import LocalProviderConfig, local_chat_model, local_embeddings
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 from dotenv import load_dotenv
@@ -23,17 +31,48 @@ class BuildRetrievalchain:
     """
     contains helper function for creating chatbot
     embeddings, llm, prompt, vector_store, retriever, retrieval_chain
+    provider sdks are imported where they are used, so importing this module stays cheap
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, timer: Optional[StartupTimer] = None):
+        self.embeddings = None
+        self.retriever = None
+        self.timer = timer or StartupTimer()
+        self.provider_config = LocalProviderConfig()
+
+    def create_embeddings_client(self):
+        """the provider embeddings, without batching or caching"""
+        if self.provider_config.is_local:
+            logging.info("Initializing local hashing embeddings (MODEL_PROVIDER=local)")
+            return local_embeddings(self.provider_config)
+        logging.info("Initializing NVIDIA Embeddings.")
+        from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+        embeddings = NVIDIAEmbeddings(model="nvidia/nv-embedqa-mistral-7b-v2",
+                                    api_key=os.getenv("NVIDIA_API_KEY"),
+                                    truncate="NONE")
+        # the client opens a new requests.Session per call by default, share one keep-alive pool instead
+        get_http_clients().attach_nvidia_session(embeddings)
+        return embeddings
+
 
     def load_embeddings(self):
         try:
-            logging.info("Initializing NVIDIA Embeddings.")
-            embeddings = NVIDIAEmbeddings(model="nvidia/nv-embedqa-mistral-7b-v2",
-                                        api_key=os.getenv("NVIDIA_API_KEY"),
-                                        truncate="NONE")
+            embeddings = self.create_embeddings_client()
+
+            # concurrent questions share one embedding request
+            batcher_config = EmbeddingBatcherConfig()
+            if batcher_config.enabled:
+                embeddings = EmbeddingBatcher(embeddings,
+                                              max_batch_size=batcher_config.max_batch_size,
+                                              max_wait_ms=batcher_config.max_wait_ms,
+                                              max_inflight_batches=batcher_config.max_inflight_batches)
+
+            # repeated questions skip the remote embedding round-trip
+            cache_config = QueryEmbeddingCacheConfig()
+            persistent_cache = EmbeddingCache(cache_config.path) if cache_config.path else None
+            embeddings = QueryEmbeddingCache(embeddings,
+                                             max_size=cache_config.max_size,
+                                             persistent_cache=persistent_cache)
                 
             logging.info("Embeddings initialized successfully.")
             return embeddings
@@ -46,11 +85,20 @@ class BuildRetrievalchain:
 
     def load_llm(self):
         try:
+            if self.provider_config.is_local:
+                logging.info("Initializing local template chat model (MODEL_PROVIDER=local)")
+                return local_chat_model(self.provider_config)
             logging.info("Initializing Llama2 model with Groq")
+            from langchain_groq import ChatGroq
+            http_client, http_async_client = get_http_clients().groq_clients()
             llm = ChatGroq(temperature=0.6,
                         model_name="llama-3.3-70b-versatile",
                         groq_api_key=os.getenv("GROQ_API_KEY"),
-                        max_tokens=4096)
+                        max_tokens=4096,
+                        # pooled keep-alive clients, timeouts and retries follow the request deadline
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                        max_retries=0)
             
             logging.info("LLM initialized successfully")
             return llm
@@ -120,8 +168,14 @@ Current context about our products and inventory:
     def load_vectorstore(self, embeddings):
         try:
             logging.info("Loading vectorstore ")
-            vector_store = PineconeVectorStore.from_existing_index(index_name="ecommerce-chatbot-project",
-                                                                   embedding=embeddings)
+            if os.getenv("VECTORSTORE_BACKEND", "pinecone").lower() == "local":
+                # memory-mapped numpy index built by VectorStoreBuilder, no network round-trip per query
+                vector_store = LocalVectorStore.load(os.getenv("LOCAL_INDEX_PATH", "artifacts/vector_index"),
+                                                     embedding=embeddings)
+            else:
+                from langchain_pinecone import PineconeVectorStore
+                vector_store = PineconeVectorStore(index=get_http_clients().pinecone_index("ecommerce-chatbot-project"),
+                                                   embedding=embeddings)
 
             logging.info("Successfully loaded vectorstore")
             return vector_store
@@ -130,11 +184,19 @@ Current context about our products and inventory:
             raise Custom_exception(e, sys)
         
 
-    def build_retriever(self, vector_store: PineconeVectorStore):
+    def build_retriever(self, vector_store: Any):
         try:
             logging.info("Initializing vector_store as retriever")
-            retriever = vector_store.as_retriever(search_type="similarity_score_threshold",
-                                                  search_kwargs={"k": 5, "score_threshold": 0.5})
+            # similarity_score_threshold search with price/rating constraints applied as metadata filters
+            retriever = ConstrainedRetriever(vector_store=vector_store, k=5, score_threshold=0.5)
+
+            # BM25 over brand/product names rescues brand and model queries the dense search misses
+            from src.utils.catalog import resolve_catalog_path
+            catalog_path = resolve_catalog_path(os.getenv("CATALOG_PATH", "artifacts/data_cleaned.parquet"))
+            if os.getenv("HYBRID_RETRIEVAL_ENABLED", "true").lower() == "true" and catalog_path:
+                retriever = HybridRetriever(vector_retriever=retriever,
+                                            lexical_index=InvertedIndex.from_catalog(catalog_path),
+                                            k=5)
             logging.info("Retriever has been initialized")
             return retriever
         except Exception as e:
@@ -146,10 +208,21 @@ Current context about our products and inventory:
     def build_chains(self, llm: Any, prompt: ChatPromptTemplate, retriever: Any):
         try:
             logging.info("Creating stuff document chain...")
+            from langchain.chains.combine_documents import create_stuff_documents_chain
+            from langchain.chains import create_retrieval_chain
+            # products are pre-rendered one per line by the context builder
             doc_chain = create_stuff_documents_chain(llm=llm, 
                                                     prompt=prompt,
                                                     output_parser=StrOutputParser(),
+                                                    document_prompt=PromptTemplate.from_template("{page_content}"),
+                                                    document_separator="\n",
                                                     document_variable_name="context")
+
+            # trims history and products to the token budget before they reach the prompt
+            template_text = "".join(getattr(getattr(message, "prompt", None), "template", "")
+                                    for message in prompt.messages)
+            context_builder = ContextBuilder(prompt_tokens=estimate_tokens(template_text))
+            doc_chain = RunnableLambda(context_builder.build).with_config(run_name="build_context") | doc_chain
             
             logging.info("Creating retrieval chain...")
             retrieval_chain = create_retrieval_chain(retriever=retriever, 
@@ -166,12 +239,19 @@ Current context about our products and inventory:
 
     def build_retrieval_chain(self):
         try:
-            embeddings = self.load_embeddings()
-            llm = self.load_llm()
+            with self.timer.phase("embeddings"):
+                embeddings = self.load_embeddings()
+            self.embeddings = embeddings                      # reused by the semantic cache
+            with self.timer.phase("llm"):
+                llm = self.load_llm()
             prompt = self.setup_prompt()
-            vector_store = self.load_vectorstore(embeddings)
-            retriever = self.build_retriever(vector_store)
-            retrieval_chain = self.build_chains(llm, prompt, retriever)
+            with self.timer.phase("vectorstore"):
+                vector_store = self.load_vectorstore(embeddings)
+            with self.timer.phase("retriever"):
+                retriever = self.build_retriever(vector_store)
+            self.retriever = retriever                        # used for the warmup query
+            with self.timer.phase("chains"):
+                retrieval_chain = self.build_chains(llm, prompt, retriever)
 
             return retrieval_chain
         except Exception as e:
@@ -181,21 +261,29 @@ Current context about our products and inventory:
     
 
 class BuildChatbot:
-    def __init__(self):
-        self.store = {}  # Persistent dictionary to maintain chat history
+    def __init__(self, store: Optional[SessionStore] = None, timer: Optional[StartupTimer] = None):
+        self.store = store if store is not None else SessionStore()  # bounded chat histories, evicted by idle TTL and LRU
+        self.timer = timer
+        # memory keeps histories in self.store, sqlite/redis share them between workers
+        self.history_config = HistoryBackendConfig()
+        self.get_history = build_history_factory(self.history_config, self.store)
+        self.embeddings = None
+        self.retrieval_chain = None
+        self.retriever = None
 
 
     def get_session_id(self, session_id: str) -> BaseChatMessageHistory:
         """creates and retrieves a chat history session."""
-        if session_id not in self.store:
-            self.store[session_id] = InMemoryChatMessageHistory()
-        return self.store[session_id]
+        return self.get_history(session_id)
 
 
     def initialize_chatbot(self):
         """Initializes the chatbot with session memory."""
-        utils = BuildRetrievalchain()
+        utils = BuildRetrievalchain(timer=self.timer)
         retrieval_chain = utils.build_retrieval_chain()
+        self.embeddings = utils.embeddings
+        self.retriever = utils.retriever
+        self.retrieval_chain = retrieval_chain          # history-free chain, shared by coalesced first turns
 
         chatbot = RunnableWithMessageHistory(runnable=retrieval_chain,
                                              get_session_history=self.get_session_id,
@@ -0,0 +1,100 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from src.utils.product_utils import parse_page_content
+from src.utils.logger import logging
+
+
+@dataclass
+class ContextBudgetConfig:
+    # whole prompt sent to the llm: system prompt + history + products + question
+    max_input_tokens = int(os.getenv("CONTEXT_MAX_INPUT_TOKENS", "3000"))
+    # history never takes more than this, the rest of the budget goes to products
+    max_history_tokens = int(os.getenv("CONTEXT_MAX_HISTORY_TOKENS", "800"))
+
+
+
+def estimate_tokens(text: str) -> int:
+    """rough llama-style estimate, ~4 characters per token"""
+    return len(text) // 4 + 1
+
+
+
+def render_product(doc: Document) -> str:
+    """
+    One line per product with only the fields the answer shows: brand, name, price, mrp, offer
+    and rating. Values are kept as they appear in the catalog, the prompt asks not to modify them.
+    """
+    fields = parse_page_content(doc.page_content)
+    parts = [f"Brand: {fields.get('Brand Name', doc.metadata.get('brand_name', ''))}",
+             f"Product: {fields.get('Product Name', doc.metadata.get('product_name', ''))}"]
+    for label, column in (("Price", "Selling Price"), ("MRP", "MRP"), ("Offer", "Offer"), ("Rating", "Rating")):
+        value = fields.get(column, "")
+        if value and value.lower() != "na":
+            parts.append(f"{label}: {value.strip('()').replace(' out of 5 stars', '/5')}")
+    return " | ".join(parts)
+
+
+
+class ContextBuilder:
+    """
+    Prepares the inputs of the stuff-documents chain: renders retrieved products compactly and
+    trims chat history and products so the whole prompt stays inside the token budget.
+    History keeps the most recent whole turns, products are kept in retrieval order.
+    """
+
+    def __init__(self, config: Optional[ContextBudgetConfig] = None, prompt_tokens: int = 0):
+        self.config = config or ContextBudgetConfig()
+        self.prompt_tokens = prompt_tokens          # fixed cost of the system prompt template
+
+
+    def _trim_history(self, messages: List[BaseMessage], budget: int):
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = estimate_tokens(str(message.content))
+            if used + tokens > budget:
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        # never start the history halfway through a turn
+        while kept and not isinstance(kept[0], HumanMessage):
+            used -= estimate_tokens(str(kept.pop(0).content))
+        return kept, used
+
+
+    def _trim_documents(self, docs: List[Document], budget: int):
+        kept, used = [], 0
+        for doc in docs:
+            text = render_product(doc)
+            tokens = estimate_tokens(text)
+            if used + tokens > budget:
+                if not kept and budget > 0:
+                    # always give the llm the best match, cut to what fits
+                    text = text[:budget * 4]
+                    kept.append(Document(page_content=text, metadata=doc.metadata, id=doc.id))
+                    used += estimate_tokens(text)
+                break
+            kept.append(Document(page_content=text, metadata=doc.metadata, id=doc.id))
+            used += tokens
+        return kept, used
+
+
+    def build(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        question_tokens = estimate_tokens(str(inputs.get("input", "")))
+        remaining = self.config.max_input_tokens - self.prompt_tokens - question_tokens
+
+        history, history_tokens = self._trim_history(list(inputs.get("chat_history") or []),
+                                                     min(self.config.max_history_tokens, max(remaining, 0)))
+        docs = list(inputs.get("context") or [])
+        context, context_tokens = self._trim_documents(docs, remaining - history_tokens)
+
+        total = self.prompt_tokens + question_tokens + history_tokens + context_tokens
+        logging.info(f"Context tokens: total={total}/{self.config.max_input_tokens} prompt={self.prompt_tokens} "
+                     f"question={question_tokens} history={history_tokens} ({len(history)}/{len(inputs.get('chat_history') or [])} messages) "
+                     f"products={context_tokens} ({len(context)}/{len(docs)} docs)")
+        return {**inputs, "chat_history": history, "context": context}
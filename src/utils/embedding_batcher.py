@@ -0,0 +1,126 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+
+
+@dataclass
+class EmbeddingBatcherConfig:
+    enabled = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+    max_batch_size = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    # how long the first query of a batch waits for others to join it
+    max_wait_ms = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+    # batches sent to the api at the same time
+    max_inflight_batches = int(os.getenv("EMBEDDING_BATCH_MAX_INFLIGHT", "4"))
+
+
+
+class EmbeddingBatcher(Embeddings):
+    """
+    Coalesces embed_query calls from concurrent requests into one api call per batch.
+    A collector thread waits at most `max_wait_ms` after the first query (or until
+    `max_batch_size` queries are queued), embeds the batch and resolves every caller's future.
+    Identical queries within a batch are embedded once.
+    """
+
+    def __init__(self, underlying: Embeddings, max_batch_size: int = 32,
+                 max_wait_ms: float = 5, max_inflight_batches: int = 4):
+        self.underlying = underlying
+        self.model = getattr(underlying, "model", type(underlying).__name__)    # keeps cache keys per model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight_batches, thread_name_prefix="embed-batch")
+        self._collector = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.api_texts = 0
+
+
+    def _ensure_started(self) -> None:
+        if self._collector is None:
+            with self._start_lock:
+                if self._collector is None:
+                    self._collector = threading.Thread(target=self._collect, name="embed-batcher", daemon=True)
+                    self._collector.start()
+
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._run_batch, batch)
+
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # nv-embedqa models embed queries and passages differently, embed_documents would
+        # produce passage vectors, so batch through the query input type when the client has it
+        if hasattr(self.underlying, "_embed"):
+            return self.underlying._embed(texts, model_type="query")
+        return self.underlying.embed_documents(texts)
+
+
+    def _run_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique_texts, self._embed_batch(unique_texts)))
+        except Exception as e:
+            logging.error(f"Error embedding batch of {len(unique_texts)} queries: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        with self._stats_lock:
+            self.batches += 1
+            self.api_texts += len(unique_texts)
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        with self._stats_lock:
+            self.requests += 1
+        self._queue.put((text, future))
+        return future
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+
+    def stats(self) -> Dict[str, float]:
+        return {"requests": self.requests,
+                "batches": self.batches,
+                "embedded_texts": self.api_texts,
+                "avg_batch_size": round(self.api_texts / self.batches, 2) if self.batches else 0.0}
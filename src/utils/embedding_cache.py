@@ -0,0 +1,232 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class QueryEmbeddingCacheConfig:
+    max_size = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    # optional sqlite file so the cache survives restarts, disabled when empty
+    path = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")
+
+
+class EmbeddingCache:
+    """
+    Persistent key -> vector store backed by a single sqlite file.
+    Vectors are stored as float32 blobs.
+    """
+
+    def __init__(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.path = path
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+        except Exception as e:
+            logging.error(f"Error opening embedding cache at {path}: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # sqlite limits the number of bound parameters, so look keys up in chunks
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+
+    def set_many(self, items: Dict[str, Sequence[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                   [(key, array("f", vector).tobytes()) for key, vector in items.items()])
+            self._conn.commit()
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object so embed_documents only calls the underlying model
+    for texts that are not in the cache yet. Query embeddings are passed through.
+    """
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model_name: Optional[str] = None):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = model_name or getattr(underlying, "model", None) or type(underlying).__name__
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()            # embed_documents is called from several ingestion workers
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        # embed each missing text once, even if it appears several times in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        misses = sum(1 for key in keys if key in missing)
+        with self._stats_lock:
+            self.hits += len(texts) - misses
+            self.misses += misses
+
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.set_many(computed)
+            vectors.update(computed)
+
+        return [vectors[key] for key in keys]
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.underlying.aembed_query(text)
+
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0}
+
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Bounded LRU cache for query embeddings on the retrieval path. Queries are normalized
+    (case and whitespace) before lookup and embedding, so trivial variations share one entry.
+    Misses fall through to an optional persistent EmbeddingCache, then to the model.
+    """
+
+    def __init__(self, underlying: Embeddings,
+                 max_size: int = 2048,
+                 persistent_cache: Optional[EmbeddingCache] = None,
+                 model_name: Optional[str] = None):
+        self.underlying = underlying
+        self.max_size = max_size
+        self.persistent_cache = persistent_cache
+        # query and passage embeddings differ for nv-embedqa models, keep them apart in a shared sqlite file
+        self.model_name = (model_name or getattr(underlying, "model", None) or type(underlying).__name__) + ":query"
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.casefold().split())
+
+
+    def _get(self, query: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._entries.get(query)
+            if vector is not None:
+                self._entries.move_to_end(query)
+                self.hits += 1
+                return vector
+
+        if self.persistent_cache is not None:
+            key = EmbeddingCache.make_key(self.model_name, query)
+            vector = self.persistent_cache.get_many([key]).get(key)
+            if vector is not None:
+                self._put(query, vector, persist=False)
+                with self._lock:
+                    self.hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+
+    def _put(self, query: str, vector: List[float], persist: bool = True) -> None:
+        with self._lock:
+            self._entries[query] = vector
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        if persist and self.persistent_cache is not None:
+            self.persistent_cache.set_many({EmbeddingCache.make_key(self.model_name, query): vector})
+
+
+    def embed_query(self, text: str) -> List[float]:
+        query = self.normalize(text)
+        vector = self._get(query)
+        if vector is None:
+            vector = self.underlying.embed_query(query)
+            self._put(query, vector)
+        return vector
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        query = self.normalize(text)
+        vector = self._get(query)
+        if vector is None:
+            vector = await self.underlying.aembed_query(query)
+            self._put(query, vector)
+        return vector
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
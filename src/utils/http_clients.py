@@ -0,0 +1,318 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+import urllib3
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils.logger import logging
+
+
+@dataclass
+class HttpClientConfig:
+    # connections kept per provider, sized to the number of chats answered at once
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", os.getenv("CHAT_MAX_CONCURRENCY", "64")))
+    keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+    connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+    # end-to-end budget of one chat turn, every provider call gets what is left of it
+    request_deadline = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+    # upper bound for a single call of each stage, also used outside of a request (startup, batches)
+    stage_timeouts = {"embedding": float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "5")),
+                      "vector_search": float(os.getenv("VECTOR_SEARCH_TIMEOUT_SECONDS", "3")),
+                      "llm": float(os.getenv("LLM_TIMEOUT_SECONDS", "25"))}
+    max_retries = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+    backoff_base = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.2"))
+    backoff_cap = float(os.getenv("HTTP_BACKOFF_CAP_SECONDS", "2"))
+    # a retry is only attempted when at least this much budget is left after the backoff
+    min_retry_budget = float(os.getenv("HTTP_MIN_RETRY_BUDGET_SECONDS", "1"))
+
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Sets the deadline of the current request. Context variables follow the request into
+    langchain's executor threads and asyncio tasks, so every provider call below sees it.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            # generator finalized from another context (client disconnected mid-stream)
+            pass
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+
+class RetryPolicy:
+    """per-call timeouts derived from the request deadline, retries with full jitter while budget remains"""
+
+    def __init__(self, config: HttpClientConfig, stage: str):
+        self.config = config
+        self.stage = stage
+
+
+    def timeout(self) -> float:
+        stage_timeout = self.config.stage_timeouts[self.stage]
+        remaining = remaining_budget()
+        if remaining is None:
+            return stage_timeout
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Request deadline exceeded before {self.stage} call")
+        return min(stage_timeout, remaining)
+
+
+    def next_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """seconds to wait before retrying, None when the retry is not worth it"""
+        if attempt >= self.config.max_retries:
+            return None
+        delay = random.uniform(0, min(self.config.backoff_cap, self.config.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        remaining = remaining_budget()
+        if remaining is not None and remaining - delay < self.config.min_retry_budget:
+            return None
+        logging.info(f"Retrying {self.stage} call in {delay:.2f}s (attempt {attempt + 1})")
+        return delay
+
+
+    @staticmethod
+    def retry_after(headers: Any) -> Optional[float]:
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+
+
+def _httpx_timeout(policy: RetryPolicy) -> Dict[str, float]:
+    timeout = policy.timeout()
+    return {"connect": min(policy.config.connect_timeout, timeout), "read": timeout, "write": timeout, "pool": timeout}
+
+
+
+class DeadlineTransport(httpx.HTTPTransport):
+    """httpx transport that applies the retry policy, used for the groq client"""
+
+    def __init__(self, policy: RetryPolicy, **kwargs):
+        super().__init__(**kwargs)
+        self.policy = policy
+
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            request.extensions["timeout"] = _httpx_timeout(self.policy)
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                delay = self.policy.next_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                delay = self.policy.next_delay(attempt, self.policy.retry_after(response.headers))
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+
+class AsyncDeadlineTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, policy: RetryPolicy, **kwargs):
+        super().__init__(**kwargs)
+        self.policy = policy
+
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            request.extensions["timeout"] = _httpx_timeout(self.policy)
+            try:
+                response = await super().handle_async_request(request)
+            except httpx.TransportError:
+                delay = self.policy.next_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                delay = self.policy.next_delay(attempt, self.policy.retry_after(response.headers))
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+
+class DeadlineSession(requests.Session):
+    """requests session with a sized keep-alive pool and the retry policy, used for nvidia"""
+
+    def __init__(self, policy: RetryPolicy, pool_size: int):
+        super().__init__()
+        self.policy = policy
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+
+    def request(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            timeout = self.policy.timeout()
+            kwargs["timeout"] = (min(self.policy.config.connect_timeout, timeout), timeout)
+            try:
+                response = super().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self.policy.next_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                delay = self.policy.next_delay(attempt, self.policy.retry_after(response.headers))
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+
+class DeadlineIndex:
+    """
+    Wraps a pinecone Index so queries get a timeout from the request deadline and are
+    retried on throttling/5xx while budget remains. Everything else is passed through.
+    """
+
+    def __init__(self, index: Any, policy: RetryPolicy):
+        self._index = index
+        self.policy = policy
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._index, name)
+
+
+    def query(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            kwargs["_request_timeout"] = self.policy.timeout()
+            try:
+                return self._index.query(*args, **kwargs)
+            except Exception as e:
+                status = getattr(e, "status", None)
+                transient = isinstance(e, (urllib3.exceptions.HTTPError, TimeoutError, ConnectionError))
+                if status not in RETRYABLE_STATUS and not transient:
+                    raise
+                delay = self.policy.next_delay(attempt, self.policy.retry_after(getattr(e, "headers", None)))
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+
+
+class HttpClients:
+    """
+    Shared, keep-alive clients for the providers on the chat path. One instance per process,
+    every chat turn reuses the same connection pools.
+    """
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        self.config = config or HttpClientConfig()
+        self._groq = None
+        self._nvidia = None
+        self._lock = threading.Lock()
+
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.config.pool_size,
+                            max_keepalive_connections=self.config.pool_size,
+                            keepalive_expiry=self.config.keepalive_expiry)
+
+
+    def groq_clients(self):
+        """(sync, async) httpx clients for ChatGroq's http_client / http_async_client"""
+        with self._lock:
+            if self._groq is None:
+                policy = RetryPolicy(self.config, "llm")
+                timeout = httpx.Timeout(self.config.stage_timeouts["llm"], connect=self.config.connect_timeout)
+                self._groq = (httpx.Client(transport=DeadlineTransport(policy, limits=self._limits()), timeout=timeout),
+                              httpx.AsyncClient(transport=AsyncDeadlineTransport(policy, limits=self._limits()), timeout=timeout))
+            return self._groq
+
+
+    def nvidia_session(self) -> DeadlineSession:
+        with self._lock:
+            if self._nvidia is None:
+                self._nvidia = DeadlineSession(RetryPolicy(self.config, "embedding"), self.config.pool_size)
+            return self._nvidia
+
+
+    def attach_nvidia_session(self, embeddings) -> bool:
+        """
+        Points NVIDIAEmbeddings at the shared session. langchain-nvidia-ai-endpoints has no public
+        hook for its requests session, only the private _client.get_session_fn factory (checked
+        against 0.3.8), so when that is gone the client keeps opening a session per call.
+        """
+        client = getattr(embeddings, "_client", None)
+        if not callable(getattr(client, "get_session_fn", None)):
+            logging.warning("NVIDIAEmbeddings has no _client.get_session_fn, embedding calls won't share "
+                            "the keep-alive pool (langchain-nvidia-ai-endpoints changed?)")
+            return False
+        session = self.nvidia_session()
+        client.get_session_fn = lambda: session
+        return True
+
+
+    def pinecone_index(self, index_name: str) -> DeadlineIndex:
+        from pinecone import Pinecone
+        # pool_threads/connection_pool_maxsize size pinecone's urllib3 pool for concurrent queries
+        client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=self.config.pool_size)
+        index = client.Index(index_name, pool_threads=self.config.pool_size,
+                             connection_pool_maxsize=self.config.pool_size)
+        return DeadlineIndex(index, RetryPolicy(self.config, "vector_search"))
+
+
+
+_clients: Optional[HttpClients] = None
+_clients_lock = threading.Lock()
+
+
+def get_http_clients() -> HttpClients:
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            _clients = HttpClients()
+        return _clients
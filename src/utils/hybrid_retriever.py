@@ -0,0 +1,161 @@
+import re
+import sys
+import math
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.utils.product_utils import make_product_id, prepare_product_document
+from src.utils.query_constraints import parse_constraints
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+
+# words that show up in almost every question and never identify a brand or model
+STOPWORDS = {"a", "an", "and", "any", "are", "can", "do", "for", "from", "give", "have", "i", "in", "is",
+             "me", "my", "of", "on", "or", "please", "show", "some", "the", "to", "under", "want",
+             "what", "which", "with", "you", "your", "below", "above", "over", "than", "less", "more",
+             "cheap", "cheapest", "best", "good", "stars", "star", "rating", "price", "off"}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_REGEX.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_key(doc: Document) -> str:
+    """stable product id, also for vector results that come back without a document id"""
+    if doc.id:
+        return doc.id
+    meta = doc.metadata
+    return make_product_id(meta.get("brand_name", ""), meta.get("product_name", ""), meta.get("category", ""))
+
+
+
+class InvertedIndex:
+    """
+    Compact in-memory BM25 index over Brand Name + Product Name.
+    Postings are stored as parallel typed arrays (doc index, term frequency) per token.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = 1.2, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths = array("H")
+
+        for doc_index, doc in enumerate(documents):
+            tokens = tokenize(f"{doc.metadata.get('brand_name', '')} {doc.metadata.get('product_name', '')}")
+            self._doc_lengths.append(min(len(tokens), 65535))
+            for token, tf in Counter(tokens).items():
+                doc_ids, tfs = self._postings.setdefault(token, (array("I"), array("H")))
+                doc_ids.append(doc_index)
+                tfs.append(min(tf, 65535))
+
+        avg_length = (sum(self._doc_lengths) / len(self._doc_lengths)) if documents else 0.0
+        # BM25 length normalization only depends on the document, precompute it once
+        self._norms = array("f", (k1 * (1 - b + b * length / avg_length) if avg_length else k1
+                                  for length in self._doc_lengths))
+        n = len(documents)
+        self._idf = {token: math.log(1 + (n - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                     for token, (doc_ids, _) in self._postings.items()}
+
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            weight = self._idf[token] * (self.k1 + 1)
+            norms = self._norms
+            for doc_index, tf in zip(*postings):
+                scores[doc_index] = scores.get(doc_index, 0.0) + weight * tf / (tf + norms[doc_index])
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[doc_index], score) for doc_index, score in top]
+
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+    @classmethod
+    def from_catalog(cls, path: str) -> "InvertedIndex":
+        """builds the index from the cleaned catalog (csv or parquet), documents match the ones in the vector index"""
+        try:
+            logging.info(f"Building lexical index from {path}")
+            if path.endswith(".parquet"):
+                from src.utils.catalog import iter_catalog_documents
+                raw_documents = iter_catalog_documents(path)
+            else:
+                from langchain_community.document_loaders.csv_loader import CSVLoader
+                raw_documents = CSVLoader(file_path=path, encoding="utf-8",
+                                          csv_args={"delimiter": ",", "quotechar": '"'}).lazy_load()
+            documents = {}
+            for doc in raw_documents:
+                doc = prepare_product_document(doc)
+                documents.setdefault(doc.id, doc)           # first occurrence wins, like the vector index
+            index = cls(list(documents.values()))
+            logging.info(f"Lexical index built with {len(index)} documents and {len(index._postings)} tokens")
+            return index
+        except Exception as e:
+            logging.error(f"Error building lexical index: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = document_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in ranked]
+
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses dense results with BM25 matches on brand/product name by reciprocal rank,
+    so queries like "Fossil watch" still get context when the vector score threshold
+    filters everything out. Lexical hits are held to the same price/rating constraints.
+    """
+
+    vector_retriever: BaseRetriever
+    lexical_index: InvertedIndex
+    k: int = 5
+    lexical_k: int = 10
+    rrf_k: int = 60
+
+
+    def _fuse(self, query: str, vector_docs: List[Document]) -> List[Document]:
+        constraints = parse_constraints(query)
+        hits = self.lexical_index.search(query, k=self.lexical_k * 3)
+        lexical_docs = [doc for doc, _ in hits if constraints.matches(doc.metadata)][:self.lexical_k]
+
+        docs = reciprocal_rank_fusion([vector_docs, lexical_docs], k=self.k, rrf_k=self.rrf_k)
+        if constraints.cheapest_first:
+            docs.sort(key=lambda doc: doc.metadata.get("selling_price", float("inf")))
+        return docs
+
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector_docs = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self._fuse(query, vector_docs)
+
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector_docs = await self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self._fuse(query, vector_docs)
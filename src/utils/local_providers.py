@@ -0,0 +1,176 @@
+import os
+import re
+import time
+import zlib
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+@dataclass
+class LocalProviderConfig:
+    # "remote" (nvidia embeddings + groq) or "local" (hashing embeddings + template chat model, no keys needed)
+    provider = os.getenv("MODEL_PROVIDER", "remote").lower()
+    embedding_dimensions = int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "384"))
+    # simulated provider latency, 0 measures the pipeline alone
+    embedding_latency_ms = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+    llm_ttft_ms = float(os.getenv("LOCAL_LLM_TTFT_MS", "0"))
+    llm_token_latency_ms = float(os.getenv("LOCAL_LLM_TOKEN_LATENCY_MS", "0"))
+
+    def __post_init__(self):
+        if self.provider not in ("remote", "local"):
+            raise ValueError(f"Unknown MODEL_PROVIDER '{self.provider}', expected 'remote' or 'local'")
+
+
+    @property
+    def is_local(self) -> bool:
+        return self.provider == "local"
+
+
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+ANSWER_TOKEN_REGEX = re.compile(r"\S+\s*|\n")
+
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic hashing-vectorizer embeddings: word unigrams and bigrams are hashed (crc32)
+    into a fixed number of signed buckets and the vector is L2-normalized. Texts sharing
+    words land close together, which is enough to exercise retrieval without a model.
+    """
+
+    def __init__(self, dimensions: int = 384, latency_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency_ms / 1000
+        self.model = f"local-hashing-{dimensions}"     # keys the embedding caches
+
+
+    def _vector(self, text: str) -> np.ndarray:
+        words = TOKEN_REGEX.findall(text.lower())
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text).tolist() for text in texts]
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(text).tolist() for text in texts]
+
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+
+class TemplateChatModel(BaseChatModel):
+    """
+    Chat model that answers from a template: it lists the first products found in the
+    system prompt's context, one word per streamed chunk. Waits `ttft_ms` before the first
+    chunk and `token_latency_ms` between chunks, and reports usage_metadata like a provider.
+    """
+
+    ttft_ms: float = 0.0
+    token_latency_ms: float = 0.0
+    max_products: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-template"
+
+
+    def _answer_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        context = str(messages[0].content) if messages else ""
+        question = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        # "Brand: ..." lines from the context builder, "Brand Name: ..." from raw documents
+        products = [line.strip() for line in context.splitlines()
+                    if line.strip().startswith("Brand")][:self.max_products]
+        if products:
+            answer = (f'Here are some products for "{question}":\n\n'
+                      + "\n\n".join(f"{i}. {product}" for i, product in enumerate(products, 1))
+                      + "\n\nLet me know if you'd like to see more options!")
+        else:
+            answer = "Sorry, I couldn't find any matching products."
+        return ANSWER_TOKEN_REGEX.findall(answer)
+
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], tokens: List[str]) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens),
+                "total_tokens": input_tokens + len(tokens)}
+
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        time.sleep((self.ttft_ms + self.token_latency_ms * max(len(tokens) - 1, 0)) / 1000)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._answer_tokens(messages)
+        time.sleep(self.ttft_ms / 1000)
+        for i, token in enumerate(tokens):
+            if i and self.token_latency_ms:
+                time.sleep(self.token_latency_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._answer_tokens(messages)
+        await asyncio.sleep((self.ttft_ms + self.token_latency_ms * max(len(tokens) - 1, 0)) / 1000)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._answer_tokens(messages)
+        await asyncio.sleep(self.ttft_ms / 1000)
+        for i, token in enumerate(tokens):
+            if i and self.token_latency_ms:
+                await asyncio.sleep(self.token_latency_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+
+
+def local_embeddings(config: Optional[LocalProviderConfig] = None) -> HashingEmbeddings:
+    config = config or LocalProviderConfig()
+    return HashingEmbeddings(dimensions=config.embedding_dimensions, latency_ms=config.embedding_latency_ms)
+
+
+def local_chat_model(config: Optional[LocalProviderConfig] = None) -> TemplateChatModel:
+    config = config or LocalProviderConfig()
+    return TemplateChatModel(ttft_ms=config.llm_ttft_ms, token_latency_ms=config.llm_token_latency_ms)
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import uuid
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store, drop-in for PineconeVectorStore.
+    Keeps L2 normalized embeddings in one numpy matrix, so cosine similarity is a
+    single matrix-vector product. Persisted as a .npy file (memory-mapped on load)
+    plus a json docstore.
+    """
+
+    matrix_file = "embeddings.npy"
+    docstore_file = "docstore.json"
+
+    def __init__(self, embedding: Embeddings,
+                 ids: Optional[List[str]] = None,
+                 texts: Optional[List[str]] = None,
+                 metadatas: Optional[List[dict]] = None,
+                 matrix: Optional[np.ndarray] = None):
+        self._embedding = embedding
+        self._ids = list(ids or [])
+        self._texts = list(texts or [])
+        self._metadatas = list(metadatas or [{} for _ in self._ids])
+        self._matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._columns = {}          # metadata key -> column array, built lazily for filtering
+        self._storage = None        # writable rows grown geometrically, _matrix is a view of the used ones
+
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """
+        makes _storage hold at least `rows` rows, doubling its capacity so a sync upserting
+        batch after batch copies every vector a constant number of times. The first call
+        also copies a loaded (read-only, mmapped) matrix into memory.
+        """
+        if self._storage is not None and self._storage.shape[0] >= rows:
+            return
+        capacity = max(rows, 2 * (self._storage.shape[0] if self._storage is not None else 0))
+        storage = np.empty((capacity, dim), dtype=np.float32)
+        if len(self._ids):
+            storage[:len(self._ids)] = self._matrix
+        self._storage = storage
+
+
+    def add_embeddings(self, texts: Sequence[str],
+                       embeddings: Sequence[Sequence[float]],
+                       metadatas: Optional[Sequence[dict]] = None,
+                       ids: Optional[Sequence[str]] = None) -> List[str]:
+        """adds precomputed embeddings, rows with an existing id are overwritten (upsert)."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        vectors = self._normalize(embeddings)
+
+        self._reserve(len(self._ids) + len(ids), vectors.shape[1])
+        for i, doc_id in enumerate(ids):
+            row = self._id_to_row.get(doc_id)
+            if row is None:
+                row = len(self._ids)
+                self._id_to_row[doc_id] = row
+                self._ids.append(doc_id)
+                self._texts.append(texts[i])
+                self._metadatas.append(dict(metadatas[i]))
+            else:
+                self._texts[row] = texts[i]
+                self._metadatas[row] = dict(metadatas[i])
+            self._storage[row] = vectors[i]
+
+        self._matrix = self._storage[:len(self._ids)]
+        self._columns = {}
+        return ids
+
+
+    def add_texts(self, texts: Iterable[str],
+                  metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        to_delete = {self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row}
+        if not to_delete:
+            return False
+
+        keep = np.array([row not in to_delete for row in range(len(self._ids))], dtype=bool)
+        self._matrix = np.array(self._matrix[keep], dtype=np.float32)
+        self._storage = None
+        self._ids = [doc_id for row, doc_id in enumerate(self._ids) if keep[row]]
+        self._texts = [text for row, text in enumerate(self._texts) if keep[row]]
+        self._metadatas = [meta for row, meta in enumerate(self._metadatas) if keep[row]]
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._columns = {}
+        return True
+
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        docs = []
+        for doc_id in ids:
+            row = self._id_to_row.get(doc_id)
+            if row is not None:
+                docs.append(self._document(row))
+        return docs
+
+
+    def _document(self, row: int) -> Document:
+        return Document(id=self._ids[row],
+                        page_content=self._texts[row],
+                        metadata=dict(self._metadatas[row]))
+
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            values = [meta.get(key) for meta in self._metadatas]
+            if all(v is None or isinstance(v, (int, float)) for v in values):
+                column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                column = np.array(values, dtype=object)
+            self._columns[key] = column
+        return column
+
+
+    @staticmethod
+    def _present(column: np.ndarray) -> np.ndarray:
+        """rows that have the field, missing values are NaN in numeric columns and None otherwise"""
+        if column.dtype == np.float64:
+            return ~np.isnan(column)
+        return np.array([v is not None for v in column], dtype=bool)
+
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        """
+        Evaluates a Pinecone style metadata filter ({"selling_price": {"$lte": 10}, ...})
+        as a boolean mask over the metadata columns. Rows missing a field never match it.
+        """
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self._filter_mask(sub_filter)
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+
+            column = self._column(key)
+            with np.errstate(invalid="ignore"):
+                for op, value in condition.items():
+                    if op == "$eq":
+                        mask &= column == value
+                    elif op == "$ne":
+                        # a missing field is unequal to anything, but Pinecone leaves such rows out
+                        mask &= (column != value) & self._present(column)
+                    elif op == "$lt":
+                        mask &= column < value
+                    elif op == "$lte":
+                        mask &= column <= value
+                    elif op == "$gt":
+                        mask &= column > value
+                    elif op == "$gte":
+                        mask &= column >= value
+                    elif op == "$in":
+                        mask &= np.isin(column, list(value))
+                    elif op == "$nin":
+                        mask &= ~np.isin(column, list(value)) & self._present(column)
+                    else:
+                        raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float],
+                                               k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+
+        query = self._normalize(embedding)[0]
+        scores = self._matrix @ query               # cosine similarity, rows are already normalized
+
+        if filter:
+            mask = self._filter_mask(filter)
+            n = int(mask.sum())
+            if n == 0:
+                return []
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, n)
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)[:k]
+
+        return [(self._document(int(row)), float(scores[row])) for row in top]
+
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)]
+
+
+    @staticmethod
+    def _cosine_relevance_score_fn(score: float) -> float:
+        # same mapping as PineconeVectorStore, so score_threshold values carry over unchanged
+        return (score + 1) / 2
+
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._cosine_relevance_score_fn
+
+
+    def save(self, path: str) -> None:
+        """writes the matrix and the docstore to `path`, replacing files atomically."""
+        try:
+            os.makedirs(path, exist_ok=True)
+            matrix_path = os.path.join(path, self.matrix_file)
+            docstore_path = os.path.join(path, self.docstore_file)
+
+            # np.save appends .npy to names that don't end with it
+            tmp_matrix_path = matrix_path[:-len(".npy")] + ".tmp.npy"
+            np.save(tmp_matrix_path, np.asarray(self._matrix, dtype=np.float32))
+            os.replace(tmp_matrix_path, matrix_path)
+
+            tmp_docstore_path = docstore_path + ".tmp"
+            with open(tmp_docstore_path, "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids,
+                           "texts": self._texts,
+                           "metadatas": self._metadatas}, f)
+            os.replace(tmp_docstore_path, docstore_path)
+
+            logging.info(f"Saved local vector store with {len(self._ids)} vectors to {path}")
+        except Exception as e:
+            logging.error(f"Error saving local vector store: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True) -> "LocalVectorStore":
+        """loads a store saved with `save`, the matrix is memory-mapped unless mmap=False."""
+        try:
+            with open(os.path.join(path, cls.docstore_file), encoding="utf-8") as f:
+                docstore = json.load(f)
+            matrix = np.load(os.path.join(path, cls.matrix_file), mmap_mode="r" if mmap else None)
+
+            logging.info(f"Loaded local vector store with {len(docstore['ids'])} vectors from {path}")
+            return cls(embedding=embedding,
+                       ids=docstore["ids"],
+                       texts=docstore["texts"],
+                       metadatas=docstore["metadatas"],
+                       matrix=matrix)
+        except Exception as e:
+            logging.error(f"Error loading local vector store: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return (os.path.exists(os.path.join(path, cls.matrix_file))
+                and os.path.exists(os.path.join(path, cls.docstore_file)))
+
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None,
+                   **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding=embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
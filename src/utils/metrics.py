@@ -0,0 +1,252 @@
+import time
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# seconds, covers cache hits (ms) up to long generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total[0]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+
+class MetricsRegistry:
+    """minimal Prometheus text-format registry, rendered by the /metrics routes"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram("chatbot_stage_seconds",
+                                   "Time spent per chat stage: embedding, vector_search, retrieval, prompt, "
+                                   "llm_ttft, llm_generation, total",
+                                   labelnames=("stage",))
+LLM_TOKENS = REGISTRY.counter("chatbot_llm_tokens_total", "LLM tokens used", labelnames=("type",))
+CHAIN_ERRORS = REGISTRY.counter("chatbot_chain_errors_total", "Chain executions that raised", labelnames=("stage",))
+CHAT_TURNS = REGISTRY.counter("chatbot_turns_total", "Chat turns by how they were answered", labelnames=("source",))
+
+# stage names emitted by components through dispatch_custom_event("stage_timing", ...)
+STAGE_TIMING_EVENT = "stage_timing"
+PROMPT_RUN_NAMES = {"build_context", "format_inputs", "ChatPromptTemplate"}
+
+
+
+class StageTimingCallbackHandler(BaseCallbackHandler):
+    """
+    Per-request callback handler that times the stages of one chain run and records them
+    when the root run ends. Embedding and vector search times come from the retriever as
+    custom events, the rest from the chain/retriever/llm callbacks.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[UUID, float] = {}
+        self._retriever_runs = set()
+        self._root: Optional[UUID] = None
+        self._first_token_seen = set()
+        self._stages: Dict[str, float] = {}
+
+
+    def _add(self, stage: str, seconds: float) -> None:
+        self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+
+    def _elapsed(self, run_id: UUID) -> Optional[float]:
+        start = self._starts.pop(run_id, None)
+        return None if start is None else time.perf_counter() - start
+
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None and self._root is None:
+            self._root = run_id
+            self._starts[run_id] = time.perf_counter()
+        elif kwargs.get("name") in PROMPT_RUN_NAMES:
+            self._starts[run_id] = time.perf_counter()
+
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed = self._elapsed(run_id)
+        if elapsed is None:
+            return
+        if run_id == self._root:
+            self._add("total", elapsed)
+            self._flush()
+        else:
+            self._add("prompt", elapsed)
+
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts.pop(run_id, None)
+        if run_id == self._root:
+            CHAIN_ERRORS.inc(stage="chain")
+            self._flush()
+
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID,
+                           parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        # nested retrievers (hybrid -> constrained) are covered by the outer one
+        if parent_run_id not in self._retriever_runs:
+            self._starts[run_id] = time.perf_counter()
+        self._retriever_runs.add(run_id)
+
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed = self._elapsed(run_id)
+        if elapsed is not None:
+            self._add("retrieval", elapsed)
+
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if self._starts.pop(run_id, None) is not None:
+            CHAIN_ERRORS.inc(stage="retrieval")
+
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if name == STAGE_TIMING_EVENT:
+            self._add(data["stage"], data["seconds"])
+
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._first_token_seen and run_id in self._starts:
+            self._first_token_seen.add(run_id)
+            self._add("llm_ttft", time.perf_counter() - self._starts[run_id])
+
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed = self._elapsed(run_id)
+        if elapsed is not None:
+            self._add("llm_generation", elapsed)
+        prompt_tokens, completion_tokens = self._token_usage(response)
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, type="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, type="completion")
+
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if self._starts.pop(run_id, None) is not None:
+            CHAIN_ERRORS.inc(stage="llm")
+
+
+    @staticmethod
+    def _token_usage(response: Any) -> Tuple[int, int]:
+        # streamed runs carry usage_metadata on the message, invoked runs in llm_output
+        for generations in getattr(response, "generations", []) or []:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+    def _flush(self) -> None:
+        for stage, seconds in self._stages.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        self._stages = {}
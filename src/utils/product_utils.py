@@ -0,0 +1,86 @@
+import os
+import re
+import json
+import hashlib
+from typing import Dict, Optional
+
+from langchain_core.documents import Document
+
+
+def parse_page_content(page_content: str) -> Dict[str, str]:
+    """parses CSVLoader style "Column: value" lines back into a dict"""
+    fields = {}
+    for line in page_content.split("\n"):
+        key, sep, value = line.partition(": ")
+        if sep:
+            fields[key.strip()] = value.strip()
+    return fields
+
+
+def make_product_id(brand_name: str, product_name: str, category: str) -> str:
+    """stable document id for a product, the same product always maps to the same vector"""
+    key = "|".join(str(part).strip().lower() for part in (brand_name, product_name, category))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def make_content_hash(page_content: str, metadata: dict) -> str:
+    """hash of everything that ends up in the index for a document, used to detect changed products"""
+    metadata = {k: v for k, v in metadata.items() if k not in ("content_hash", "source", "row")}
+    payload = page_content + "\x00" + json.dumps(metadata, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+
+NUMBER_REGEX = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_number(value: str) -> Optional[float]:
+    """first number in a scraped field: "£1,299.00" -> 1299.0, "4.0 out of 5 stars" -> 4.0, "(50% off)" -> 50.0"""
+    match = NUMBER_REGEX.search(str(value))
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+# CSV column -> numeric metadata key used for filtering
+NUMERIC_FIELDS = {"Selling Price": "selling_price",
+                  "MRP": "mrp",
+                  "Offer": "discount",
+                  "Rating": "rating",
+                  "Rating Count": "rating_count"}
+
+
+def numeric_metadata(fields: Dict[str, str]) -> Dict[str, float]:
+    """numeric versions of the price/rating columns, missing or 'na' values are left out"""
+    metadata = {}
+    for column, key in NUMERIC_FIELDS.items():
+        value = parse_number(fields.get(column, ""))
+        if value is not None:
+            metadata[key] = value
+    return metadata
+
+
+
+def prepare_product_document(doc: Document) -> Document:
+    """
+    Turns a CSVLoader row into the document stored in the index: drops the unnamed index
+    column, truncates text to 512 characters and sets the stable id, the metadata used for
+    filtering and the content hash. Shared by VectorStoreBuilder and the lexical index so
+    both produce identical documents.
+    """
+    fields = parse_page_content(doc.page_content)
+    fields.pop("", None)
+    doc.page_content = "\n".join(f"{k}: {v}" for k, v in fields.items())[:512]
+
+    category = fields.get("Category", os.path.splitext(os.path.basename(doc.metadata.get("source", "")))[0])
+    doc.id = make_product_id(fields.get("Brand Name", ""), fields.get("Product Name", ""), category)
+    # numeric copies of price/rating so retrieval can filter on them (pinecone metadata filters)
+    doc.metadata.update({"brand_name": fields.get("Brand Name", ""),
+                         "product_name": fields.get("Product Name", ""),
+                         "category": category,
+                         **numeric_metadata(fields)})
+    doc.metadata["content_hash"] = make_content_hash(doc.page_content, doc.metadata)
+    return doc
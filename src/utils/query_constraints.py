@@ -0,0 +1,195 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import (AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun,
+                                      adispatch_custom_event, dispatch_custom_event)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import run_in_executor
+
+from src.utils.metrics import STAGE_TIMING_EVENT
+
+from src.utils.logger import logging
+
+
+# a number that isn't part of a rating ("4 stars") or a percentage ("50% off")
+_AMOUNT = r"(?:£|gbp\s*)?(\d+(?:\.\d+)?)(?![\d.])(?!\s*(?:stars?|%|percent))(?:\s*(?:pounds|gbp|quid))?"
+
+MAX_PRICE_REGEX = re.compile(r"\b(?:under|below|less than|cheaper than|up ?to|within|max(?:imum)?|no more than|not more than|at most)\s*" + _AMOUNT
+                             + r"|<\s*" + _AMOUNT, re.IGNORECASE)
+# "over"/"from" are also used for ratings and years, a price floor needs a currency or a price word
+_PRICED_AMOUNT = (r"(?:(?:£|₹|\brs\.?\s*|\binr\s*|\bgbp\s*)(\d+(?:\.\d+)?)(?![\d.])"
+                  r"|(\d+(?:\.\d+)?)\s*(?:pounds|gbp|quid|rupees|rs\b|inr)\b)")
+_MIN_WORDS = r"(?:over|above|more than|at least|from|min(?:imum)?)"
+MIN_PRICE_REGEX = re.compile(r"\b" + _MIN_WORDS + r"\s*" + _PRICED_AMOUNT
+                             + r"|\b(?:price[ds]?|costs?|costing)\s*(?:is\s*|of\s*)?" + _MIN_WORDS + r"\s*" + _AMOUNT,
+                             re.IGNORECASE)
+PRICE_RANGE_REGEX = re.compile(r"\bbetween\s*" + _AMOUNT + r"\s*(?:and|to|-)\s*" + _AMOUNT, re.IGNORECASE)
+RATING_REGEX = re.compile(r"(\d(?:\.\d)?)\s*(?:\+\s*)?stars?"
+                          r"|\brat(?:ed|ing)\s*(?:of\s*|above\s*|over\s*|at least\s*)?(\d(?:\.\d)?)(?![\d.%])", re.IGNORECASE)
+DISCOUNT_REGEX = re.compile(r"(\d{1,2})\s*(?:%|percent)\s*(?:off|discount)", re.IGNORECASE)
+CHEAPEST_REGEX = re.compile(r"\b(?:cheapest|lowest price[ds]?|least expensive|most affordable|budget)\b", re.IGNORECASE)
+
+
+
+@dataclass
+class QueryConstraints:
+    max_price: Optional[float] = None
+    min_price: Optional[float] = None
+    min_rating: Optional[float] = None
+    min_discount: Optional[float] = None
+    cheapest_first: bool = False
+
+
+    def is_empty(self) -> bool:
+        return self == QueryConstraints()
+
+
+    def to_filter(self) -> dict:
+        """metadata filter in Pinecone's syntax, LocalVectorStore evaluates the same dict"""
+        conditions = {}
+        price = {}
+        if self.max_price is not None:
+            price["$lte"] = self.max_price
+        if self.min_price is not None:
+            price["$gte"] = self.min_price
+        if price:
+            conditions["selling_price"] = price
+        if self.min_rating is not None:
+            conditions["rating"] = {"$gte": self.min_rating}
+        if self.min_discount is not None:
+            conditions["discount"] = {"$gte": self.min_discount}
+        return conditions
+
+
+    def matches(self, metadata: dict) -> bool:
+        """same check as to_filter, for documents that didn't come out of a filtered vector search"""
+        checks = [("selling_price", self.max_price, lambda v, bound: v <= bound),
+                  ("selling_price", self.min_price, lambda v, bound: v >= bound),
+                  ("rating", self.min_rating, lambda v, bound: v >= bound),
+                  ("discount", self.min_discount, lambda v, bound: v >= bound)]
+        for key, bound, check in checks:
+            if bound is None:
+                continue
+            value = metadata.get(key)
+            if value is None or not check(value, bound):
+                return False
+        return True
+
+
+
+def _search_outside(pattern: re.Pattern, query: str, used: Optional[re.Match]) -> Optional[re.Match]:
+    """first match of `pattern` that doesn't overlap the text another constraint already used"""
+    for match in pattern.finditer(query):
+        if used is None or match.end() <= used.start() or match.start() >= used.end():
+            return match
+    return None
+
+
+
+def parse_constraints(query: str) -> QueryConstraints:
+    """
+    Extracts structured constraints from phrases like "under £10", "between £5 and £20",
+    "4 stars and above", "50% off" and "cheapest".
+    """
+    constraints = QueryConstraints()
+    rating_match = RATING_REGEX.search(query)
+
+    range_match = PRICE_RANGE_REGEX.search(query)
+    if range_match:
+        low, high = sorted(float(v) for v in range_match.groups())
+        constraints.min_price, constraints.max_price = low, high
+    else:
+        max_match = _search_outside(MAX_PRICE_REGEX, query, rating_match)
+        if max_match:
+            constraints.max_price = float(next(v for v in max_match.groups() if v is not None))
+        min_match = _search_outside(MIN_PRICE_REGEX, query, rating_match)
+        if min_match:
+            constraints.min_price = float(next(v for v in min_match.groups() if v is not None))
+
+    if rating_match:
+        rating = float(next(v for v in rating_match.groups() if v is not None))
+        # "4 stars" means at least 4, an upper bound ("below 4 stars") is not supported
+        preceding = query[max(0, rating_match.start() - 12):rating_match.start()].lower()
+        if rating <= 5 and not re.search(r"under|below|less than|lower than", preceding):
+            constraints.min_rating = rating
+
+    discount_match = DISCOUNT_REGEX.search(query)
+    if discount_match:
+        constraints.min_discount = float(discount_match.group(1))
+
+    constraints.cheapest_first = bool(CHEAPEST_REGEX.search(query))
+    return constraints
+
+
+
+class ConstrainedRetriever(BaseRetriever):
+    """
+    Similarity retriever that turns price/rating constraints found in the question into a
+    metadata filter, so the k documents handed to the LLM already satisfy them.
+    Keeps the similarity_score_threshold semantics of vector_store.as_retriever.
+    """
+
+    vector_store: Any
+    k: int = 5
+    score_threshold: float = 0.5
+    fetch_k: int = 50             # candidates fetched when re-ranking by price ("cheapest")
+
+
+    def _search_kwargs(self, query: str) -> Tuple[QueryConstraints, dict]:
+        constraints = parse_constraints(query)
+        kwargs = {"k": self.fetch_k if constraints.cheapest_first else self.k,
+                  "score_threshold": self.score_threshold}
+        search_filter = constraints.to_filter()
+        if search_filter:
+            kwargs["filter"] = search_filter
+        if not constraints.is_empty():
+            logging.info(f"Query constraints: {constraints}")
+        return constraints, kwargs
+
+
+    def _search(self, vector: List[float], kwargs: dict) -> List[Tuple[Document, float]]:
+        """vector search with relevance scores and threshold, as similarity_search_with_relevance_scores does"""
+        docs_and_scores = self.vector_store.similarity_search_by_vector_with_score(
+            vector, k=kwargs["k"], filter=kwargs.get("filter"))
+        relevance_fn = self.vector_store._select_relevance_score_fn()
+        return [(doc, relevance_fn(score)) for doc, score in docs_and_scores
+                if relevance_fn(score) >= kwargs["score_threshold"]]
+
+
+    def _finalize(self, constraints: QueryConstraints, docs_and_scores: List[Tuple[Document, float]]) -> List[Document]:
+        docs = [doc for doc, _ in docs_and_scores]
+        if constraints.cheapest_first:
+            docs.sort(key=lambda doc: doc.metadata.get("selling_price", float("inf")))
+        return docs[:self.k]
+
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        constraints, kwargs = self._search_kwargs(query)
+        # embedding and search are timed separately for the /metrics stage histograms
+        config = {"callbacks": run_manager.get_child()}
+        start = time.perf_counter()
+        vector = self.vector_store.embeddings.embed_query(query)
+        embedded = time.perf_counter()
+        docs_and_scores = self._search(vector, kwargs)
+        dispatch_custom_event(STAGE_TIMING_EVENT, {"stage": "embedding", "seconds": embedded - start}, config=config)
+        dispatch_custom_event(STAGE_TIMING_EVENT, {"stage": "vector_search", "seconds": time.perf_counter() - embedded},
+                              config=config)
+        return self._finalize(constraints, docs_and_scores)
+
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        constraints, kwargs = self._search_kwargs(query)
+        config = {"callbacks": run_manager.get_child()}
+        start = time.perf_counter()
+        vector = await self.vector_store.embeddings.aembed_query(query)
+        embedded = time.perf_counter()
+        docs_and_scores = await run_in_executor(None, self._search, vector, kwargs)
+        await adispatch_custom_event(STAGE_TIMING_EVENT, {"stage": "embedding", "seconds": embedded - start}, config=config)
+        await adispatch_custom_event(STAGE_TIMING_EVENT, {"stage": "vector_search", "seconds": time.perf_counter() - embedded},
+                                     config=config)
+        return self._finalize(constraints, docs_and_scores)
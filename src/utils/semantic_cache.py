@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+
+
+@dataclass
+class SemanticCacheConfig:
+    enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))     # cosine similarity needed for a hit
+    max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+    ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
+    # VectorStoreBuilder touches this file whenever the index changes, cached answers older than it are dropped
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        index_version_path = "/opt/airflow/artifacts/index_version.txt"
+    else:
+        index_version_path = os.getenv("INDEX_VERSION_PATH", "artifacts/index_version.txt")
+    version_check_interval = 5.0
+
+
+
+NUMBER_REGEX = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _numbers(text: str) -> Tuple[str, ...]:
+    # "sarees under £10" and "sarees under £20" embed almost identically, so numbers must match exactly
+    return tuple(sorted(n.replace(",", "") for n in NUMBER_REGEX.findall(text)))
+
+
+
+@dataclass
+class _Entry:
+    question: str
+    answer: str
+    slot: int                   # row of the entry's vector in the cache matrix
+    numbers: Tuple[str, ...]
+    created_at: float
+
+
+
+class SemanticCache:
+    """
+    Answer cache for stateless first-turn questions, looked up by query embedding similarity.
+    Bounded by LRU and TTL, and emptied whenever the vector index is rebuilt.
+
+    Vectors live in a matrix preallocated for max_entries rows. An entry keeps its row for
+    its lifetime, stores and evictions write or clear that single row and hand slots back
+    through a free list, so lookups never rebuild the matrix.
+    """
+
+    def __init__(self, embeddings: Embeddings, config: Optional[SemanticCacheConfig] = None):
+        self.embeddings = embeddings
+        self.config = config or SemanticCacheConfig()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None          # allocated on the first store, once the dimension is known
+        self._used: Optional[np.ndarray] = None            # rows holding a live entry
+        self._slot_keys: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._index_version = self._read_index_version()
+        self._last_version_check = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+
+    def _read_index_version(self) -> Optional[float]:
+        try:
+            return os.stat(self.config.index_version_path).st_mtime
+        except OSError:
+            return None
+
+
+    def _check_index_version(self) -> None:
+        now = time.monotonic()
+        if now - self._last_version_check < self.config.version_check_interval:
+            return
+        self._last_version_check = now
+        version = self._read_index_version()
+        if version != self._index_version:
+            logging.info("Vector index changed, clearing semantic cache")
+            self._index_version = version
+            self._clear_entries()
+
+
+    def _allocate(self, dimensions: int) -> None:
+        size = self.config.max_entries
+        self._matrix = np.zeros((size, dimensions), dtype=np.float32)
+        self._used = np.zeros(size, dtype=bool)
+        self._slot_keys = [None] * size
+        self._free = list(range(size - 1, -1, -1))        # lowest slots are handed out first
+
+
+    def _release(self, entry: _Entry) -> None:
+        self._matrix[entry.slot] = 0.0
+        self._used[entry.slot] = False
+        self._slot_keys[entry.slot] = None
+        self._free.append(entry.slot)
+
+
+    def _clear_entries(self) -> None:
+        self._entries.clear()
+        if self._matrix is not None:
+            self._allocate(self._matrix.shape[1])
+
+
+    def _evict_expired(self) -> None:
+        cutoff = time.time() - self.config.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry.created_at < cutoff]
+        for key in expired:
+            self._release(self._entries.pop(key))
+
+
+    def _search(self, question: str, vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            self._check_index_version()
+            self._evict_expired()
+            if not self._entries:
+                return None
+
+            scores = self._matrix @ vector
+            candidates = np.flatnonzero(self._used & (scores >= self.config.threshold))
+            numbers = _numbers(question)
+            for row in candidates[np.argsort(-scores[candidates])]:
+                key = self._slot_keys[row]
+                entry = self._entries[key]
+                if entry.numbers == numbers:
+                    self._entries.move_to_end(key)       # LRU order, the matrix rows don't move
+                    return entry.answer
+            return None
+
+
+    def lookup(self, question: str) -> Tuple[Optional[str], np.ndarray]:
+        """returns (cached answer or None, query vector), pass the vector back to `store` on a miss"""
+        vector = self._normalize(self.embeddings.embed_query(question))
+        answer = self._search(question, vector)
+        self._count(answer)
+        return answer, vector
+
+
+    async def alookup(self, question: str) -> Tuple[Optional[str], np.ndarray]:
+        vector = self._normalize(await self.embeddings.aembed_query(question))
+        answer = self._search(question, vector)
+        self._count(answer)
+        return answer, vector
+
+
+    def _count(self, answer: Optional[str]) -> None:
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+
+    def store(self, question: str, answer: str, vector: np.ndarray) -> None:
+        if self.config.max_entries <= 0:
+            return
+        with self._lock:
+            if self._matrix is None:
+                self._allocate(len(vector))
+            key = self._key(question)
+            entry = self._entries.get(key)
+            if entry is not None:
+                slot = entry.slot
+            else:
+                if len(self._entries) >= self.config.max_entries:
+                    self._release(self._entries.popitem(last=False)[1])
+                slot = self._free.pop()
+            self._matrix[slot] = vector
+            self._used[slot] = True
+            self._slot_keys[slot] = key
+            self._entries[key] = _Entry(question, answer, slot, _numbers(question), time.time())
+            self._entries.move_to_end(key)
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_entries()
+
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+
+
+def touch_index_version(path: str) -> None:
+    """marks the vector index as changed, semantic caches notice it by the file's mtime"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(str(time.time()))
@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import BaseMessage
+
+from src.utils.logger import logging
+
+
+@dataclass
+class SessionStoreConfig:
+    max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    idle_ttl_seconds = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+    # messages kept per session (human + ai), older turns are dropped from the prompt
+    max_messages = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+
+
+
+SESSION_ID_REGEX = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+
+class BoundedChatMessageHistory(InMemoryChatMessageHistory):
+    """in-memory history that only keeps the most recent `max_messages` messages"""
+
+    max_messages: int = 20
+
+    def add_message(self, message: BaseMessage) -> None:
+        super().add_message(message)
+        self._trim()
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.messages.extend(messages)
+        self._trim()
+
+    def _trim(self) -> None:
+        excess = len(self.messages) - self.max_messages
+        if excess > 0:
+            # drop whole turns so the history never starts with an ai message
+            excess += excess % 2
+            del self.messages[:excess]
+
+
+
+class SessionStore:
+    """
+    Chat histories keyed by session id, bounded by an idle TTL and an LRU cap on the
+    number of live sessions. Sessions are kept in last-access order, so expired ones
+    are always at the front and eviction is cheap.
+    """
+
+    def __init__(self, config: Optional[SessionStoreConfig] = None):
+        self.config = config or SessionStoreConfig()
+        self._sessions: "OrderedDict[str, BoundedChatMessageHistory]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+
+    @staticmethod
+    def new_session_id() -> str:
+        return secrets.token_urlsafe(16)
+
+
+    def resolve(self, session_id: Optional[str]) -> str:
+        """returns the client's session id if it is well formed, otherwise issues a new one"""
+        if session_id and SESSION_ID_REGEX.match(session_id):
+            return session_id
+        return self.new_session_id()
+
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.config.idle_ttl_seconds
+        expired, over_cap = 0, 0
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if self._last_access[oldest] >= cutoff and len(self._sessions) <= self.config.max_sessions:
+                break
+            if self._last_access[oldest] < cutoff:
+                expired += 1
+            else:
+                over_cap += 1
+            del self._sessions[oldest]
+            del self._last_access[oldest]
+        if expired or over_cap:
+            self.evicted += expired + over_cap
+            logging.info(f"Evicted {expired} idle and {over_cap} least recently used sessions, "
+                         f"{len(self._sessions)} live")
+
+
+    def get(self, session_id: str) -> BoundedChatMessageHistory:
+        now = time.monotonic()
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = BoundedChatMessageHistory(max_messages=self.config.max_messages)
+                self._sessions[session_id] = history
+            else:
+                self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+            self._evict(now)
+            return history
+
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            self._evict(time.monotonic())
+            histories = list(self._sessions.values())
+        messages = [message for history in histories for message in history.messages]
+        # rough estimate: message text plus python object overhead
+        approx_bytes = sum(sys.getsizeof(message.content) + 500 for message in messages)
+        return {"live_sessions": len(histories),
+                "messages": len(messages),
+                "approx_memory_bytes": approx_bytes,
+                "evicted_sessions": self.evicted}
@@ -0,0 +1,202 @@
+import os
+import asyncio
+import contextvars
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from src.utils.logger import logging
+
+
+@dataclass
+class SingleFlightConfig:
+    enabled = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+
+
+def flight_key(question: str) -> str:
+    """identical questions up to case and whitespace share one flight"""
+    return " ".join(question.casefold().split())
+
+
+
+class Flight:
+    """
+    One in-flight chain execution. Tokens are kept as they arrive so waiters that join late
+    replay the answer from the start; streamed and non-streamed waiters read the same tokens.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+        self._cond = threading.Condition()
+
+
+    def publish(self, token: str) -> None:
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+
+    def iter_tokens(self) -> Iterator[str]:
+        position = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: position < len(self.tokens) or self.done)
+                new_tokens = self.tokens[position:]
+                finished = self.done
+            position += len(new_tokens)
+            yield from new_tokens
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+    def answer(self) -> str:
+        return "".join(self.tokens)
+
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests: the first caller for a key starts `produce`
+    in a background thread, callers arriving while it runs join the same Flight.
+    The key is released as soon as the flight finishes, nothing is cached afterwards.
+    Running in the background means a leader that disconnects doesn't cancel the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.flights = 0
+        self.coalesced = 0
+
+
+    def join(self, key: str, produce: Callable[[Flight], None]) -> Tuple[Flight, bool]:
+        """returns the flight for key and whether this caller started it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.flights += 1
+        # run in a copy of the leader's context so the request deadline applies to the shared run
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._run, key, flight, produce),
+                         name="single-flight", daemon=True).start()
+        return flight, True
+
+
+    def _run(self, key: str, flight: Flight, produce: Callable[[Flight], None]) -> None:
+        error = None
+        try:
+            produce(flight)
+        except Exception as e:
+            logging.error(f"Error in coalesced request: {str(e)}")
+            error = e
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.finish(error)
+
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights),
+                "flights": self.flights,
+                "coalesced_requests": self.coalesced}
+
+
+
+class AsyncFlight:
+    """asyncio version of Flight, for the quart app"""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+        self.task: Optional[asyncio.Task] = None
+        self._cond = asyncio.Condition()
+
+
+    async def publish(self, token: str) -> None:
+        async with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+
+    async def finish(self, error: Optional[BaseException] = None) -> None:
+        async with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+
+    async def iter_tokens(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: position < len(self.tokens) or self.done)
+                new_tokens = self.tokens[position:]
+                finished = self.done
+            position += len(new_tokens)
+            for token in new_tokens:
+                yield token
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+    def answer(self) -> str:
+        return "".join(self.tokens)
+
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight, the flight runs as its own task"""
+
+    def __init__(self):
+        self._flights: Dict[str, AsyncFlight] = {}
+        self.flights = 0
+        self.coalesced = 0
+
+
+    def join(self, key: str, produce: Callable[[AsyncFlight], Awaitable[None]]) -> Tuple[AsyncFlight, bool]:
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            self.coalesced += 1
+            return flight, False
+        flight = self._flights[key] = AsyncFlight()
+        self.flights += 1
+        flight.task = asyncio.create_task(self._run(key, flight, produce))
+        return flight, True
+
+
+    async def _run(self, key: str, flight: AsyncFlight, produce: Callable[[AsyncFlight], Awaitable[None]]) -> None:
+        error = None
+        try:
+            await produce(flight)
+        except Exception as e:
+            logging.error(f"Error in coalesced request: {str(e)}")
+            error = e
+        self._flights.pop(key, None)
+        await flight.finish(error)
+
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights),
+                "flights": self.flights,
+                "coalesced_requests": self.coalesced}
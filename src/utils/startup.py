@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from src.utils.session_store import SessionStore
+from src.utils.logger import logging
+
+
+# retrieval-only warmup: embeds a query and searches the index so the first visitor doesn't pay
+# for cold connections, page faults and caches. empty disables it
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "show me sarees under £10")
+
+
+
+class StartupTimer:
+    """wall time per startup phase, in the order the phases ran"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 3)
+
+
+    def report(self) -> Dict[str, Any]:
+        return {"phases": dict(self.phases),
+                "total_seconds": round(sum(self.phases.values()), 3)}
+
+
+
+class ChatRuntime:
+    """
+    Builds the chatbot in a background thread so the web server can bind and answer
+    /healthz right away. Heavy modules (langchain, pinecone, nvidia, groq) are only
+    imported inside that thread. `ready` flips once the chains are built and warmed up.
+    """
+
+    def __init__(self, session_store: Optional[SessionStore] = None):
+        self.session_store = session_store if session_store is not None else SessionStore()   # an empty store is falsy
+        self.timer = StartupTimer()
+        self.state = "not_started"
+        self.error: Optional[str] = None
+        self.utils = None
+        self.chat_service = None
+        self.semantic_cache = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+
+    @property
+    def failed(self) -> bool:
+        """startup failed for good, /healthz reports it so the process gets restarted"""
+        return self.state == "failed"
+
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.state != "not_started":
+                return
+            self.state = "starting"
+        threading.Thread(target=self._build, name="chatbot-startup", daemon=True).start()
+
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+
+    def _build(self) -> None:
+        try:
+            with self.timer.phase("imports"):
+                from src.utils.chatbot_utils import BuildChatbot
+                from src.utils.chat_service import ChatService
+                from src.utils.semantic_cache import SemanticCache, SemanticCacheConfig
+                from src.utils.single_flight import SingleFlightConfig
+
+            utils = BuildChatbot(store=self.session_store, timer=self.timer)
+            if utils.store is not self.session_store:
+                # /stats, resolve() and the cookie ttl read the app's store, the chains must write to it
+                raise RuntimeError("Chat histories are not kept in the app's session store")
+            chatbot = utils.initialize_chatbot()
+
+            with self.timer.phase("services"):
+                semantic_cache_config = SemanticCacheConfig()
+                semantic_cache = SemanticCache(utils.embeddings, semantic_cache_config) if semantic_cache_config.enabled else None
+                # identical first-turn questions in flight at the same time share one chain run
+                coalesce_chain = utils.retrieval_chain if SingleFlightConfig().enabled else None
+                chat_service = ChatService(chatbot, get_session_history=utils.get_session_id,
+                                           semantic_cache=semantic_cache, chain=coalesce_chain)
+
+            if WARMUP_QUERY:
+                with self.timer.phase("warmup"):
+                    docs = utils.retriever.invoke(WARMUP_QUERY)
+                    logging.info(f"Warmup query returned {len(docs)} documents")
+
+            self.utils, self.semantic_cache, self.chat_service = utils, semantic_cache, chat_service
+            self.state = "ready"
+            self._ready.set()
+            logging.info(f"Chatbot ready, startup breakdown: {self.timer.report()}")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logging.error(f"Chatbot startup failed after {self.timer.report()}: {str(e)}", exc_info=True)
+
+
+    def status(self) -> Dict[str, Any]:
+        return {"status": self.state,
+                "error": self.error,
+                "startup": self.timer.report()}
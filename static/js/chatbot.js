@@ -65,6 +65,105 @@ document.addEventListener('DOMContentLoaded', function() {
         indicator.classList.remove('active');
     }
 
+    function formatBotResponse(text) {
+        if (text.includes('Order Invoice')) {
+            text = text
+                .replace(/-----------------------------/g, '─'.repeat(35))
+                .replace(/ {2,}/g, ' ')
+                .trim();
+        }
+        return text;
+    }
+
+    // Non-streaming fallback, waits for the complete answer
+    async function fetchFullResponse(message) {
+        const response = await fetch('/chat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ input: message })
+        });
+
+        if (!response.ok) throw new Error('Network response was not ok');
+
+        const data = await response.json();
+        hideTypingIndicator();
+        addMessage(formatBotResponse(data.response), 'bot');
+    }
+
+    // Streams the answer over Server-Sent Events and renders tokens as they arrive
+    async function streamResponse(message) {
+        const response = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({ input: message })
+        });
+
+        if (!response.ok) throw new Error('Network response was not ok');
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        let messageElement = null;
+
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // events are separated by a blank line
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+
+                for (const rawEvent of events) {
+                    let eventType = 'message';
+                    let data = '';
+                    rawEvent.split('\n').forEach(line => {
+                        if (line.startsWith('event: ')) eventType = line.slice(7);
+                        else if (line.startsWith('data: ')) data += line.slice(6);
+                    });
+                    const payload = data ? JSON.parse(data) : {};
+
+                    if (eventType === 'error') throw new Error(payload.error);
+                    if (eventType === 'done' || !payload.token) continue;
+
+                    answer += payload.token;
+                    if (!messageElement) {
+                        hideTypingIndicator();
+                        messageElement = document.createElement('div');
+                        messageElement.className = 'message bot-message';
+                        messagesContainer.appendChild(messageElement);
+                    }
+                    messageElement.innerHTML = answer.replace(/\n/g, '<br>');
+                    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                }
+            }
+        } catch (error) {
+            // nothing rendered yet, the caller shows the apology
+            if (!messageElement) throw error;
+            // keep the partial answer and mark it as cut off instead of adding a second reply
+            console.error('Error:', error);
+            hideTypingIndicator();
+            messageElement.innerHTML = formatBotResponse(answer).replace(/\n/g, '<br>') +
+                '<br><em>Sorry, the rest of this answer could not be loaded. Please try again.</em>';
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            return;
+        }
+
+        hideTypingIndicator();
+        if (messageElement) {
+            messageElement.innerHTML = formatBotResponse(answer).replace(/\n/g, '<br>');
+        } else {
+            addMessage('Sorry, I am unable to process your request right now.', 'bot');
+        }
+    }
+
     // Function to send message to backend and get response
     async function sendMessage() {
         const message = textarea.value.trim();
@@ -76,28 +175,11 @@ document.addEventListener('DOMContentLoaded', function() {
 
         showTypingIndicator();
         try {
-            const response = await fetch('/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ input: message })
-            });
-
-            if (!response.ok) throw new Error('Network response was not ok');
-
-            const data = await response.json();
-            hideTypingIndicator();
-            
-            let formattedResponse = data.response;
-            if (formattedResponse.includes('Order Invoice')) {
-                formattedResponse = formattedResponse
-                    .replace(/-----------------------------/g, '─'.repeat(35))
-                    .replace(/ {2,}/g, ' ')
-                    .trim();
+            if (window.ReadableStream && window.TextDecoder) {
+                await streamResponse(message);
+            } else {
+                await fetchFullResponse(message);
             }
-            
-            addMessage(formattedResponse, 'bot');
 
         } catch (error) {
             console.error('Error:', error);